@@ -1,57 +1,51 @@
 """FastAPI application for financial dashboard (Finnhub, rate-limited)."""
 
+import asyncio
+import dataclasses
 import logging
 import os
 from datetime import datetime, timezone
-from pathlib import Path
-from typing import Optional
+from operator import attrgetter
+from typing import Any, Literal, Optional, Union
+
+from dotenv import dotenv_values
 
 
 def load_env_file(env_path: str = ".env") -> None:
-    """Load environment variables from .env file."""
-    env_file = Path(env_path)
-    if not env_file.exists():
-        return
-    
-    with open(env_file, "r") as f:
-        for line in f:
-            line = line.strip()
-            if not line or line.startswith("#"):
-                continue
-            if "=" in line:
-                key, value = line.split("=", 1)
-                key = key.strip()
-                value = value.strip().strip('"').strip("'")
-                if key and value:
-                    os.environ.setdefault(key, value)
+    """Load environment variables from .env file (existing variables win, empty values are skipped)."""
+    for key, value in dotenv_values(env_path).items():
+        if value:
+            os.environ.setdefault(key, value)
 
 
 # Load .env file if it exists
 load_env_file()
 
+import orjson
 from fastapi import FastAPI, HTTPException, Query
 from fastapi.middleware.cors import CORSMiddleware
-from starlette.middleware.base import BaseHTTPMiddleware
-from starlette.requests import Request
-from starlette.responses import Response
+from starlette.responses import Response, StreamingResponse
+from starlette.types import ASGIApp, Receive, Scope, Send
 
 import finnhub_client
-from cache import get_quote_cache
+from finnhub_client import QuoteResult
+from cache import QuoteCache
 from data_loader import (
-    get_constituents_by_sector,
-    get_constituents_by_subsector,
-    get_sectors_with_counts,
-    get_subsectors_for_sector,
-    load_constituents,
+    ConstituentIndex,
+    ConstituentRow,
+    load_constituent_index,
     search_constituents,
 )
-from limiter import get_rate_limiter
+from limiter import AdmissionGate, get_rate_limiter, size_gate_to_limiter
 from models import (
     CompanyQuote,
     HealthResponse,
     IndexResponse,
+    QuoteSource,
+    SearchResult,
     SectorMeta,
     SectorResponse,
+    SectorResponseCompact,
     SectorSummary,
     SubIndustrySummary,
 )
@@ -65,55 +59,81 @@ logger = logging.getLogger(__name__)
 APP_VERSION = "0.1.0"
 DEFAULT_LIMIT = 50
 MAX_COMPANIES_PER_REQUEST = int(os.environ.get("MAX_COMPANIES_PER_REQUEST", "80"))
+FETCH_CONCURRENCY = int(os.environ.get("FETCH_CONCURRENCY", "10"))
+SECTOR_RESPONSE_TTL = int(os.environ.get("SECTOR_RESPONSE_TTL_SECONDS", "10"))
+
+# "full": companies as a list of objects; "compact": one list per field (column layout)
+ResponseFormat = Literal["full", "compact"]
+_COMPANY_FIELDS = tuple(f.name for f in dataclasses.fields(CompanyQuote))
+_COMPANY_ROW = attrgetter(*_COMPANY_FIELDS)
+
+# Caps how many symbols a sector fan-out has in flight at once; resized in the
+# background to what the rate limiter can currently absorb
+_FETCH_GATE = AdmissionGate(FETCH_CONCURRENCY)
+
+# Encoded sector/subsector responses, so bursts of identical requests skip the
+# per-symbol lookups and serialization entirely (bypassed by refresh=true)
+_response_cache = QuoteCache(ttl_seconds=SECTOR_RESPONSE_TTL, maxsize=128)
 
 app = FastAPI(title="Financial Dashboard API", version=APP_VERSION)
 
-# Allowed origins for CORS
-ALLOWED_ORIGINS = [
+# Allowed origins for CORS (frozenset: O(1) membership check per request)
+ALLOWED_ORIGINS: frozenset[str] = frozenset({
     "http://localhost:5173",
     "http://127.0.0.1:5173",
     "http://localhost:3000",
     "http://127.0.0.1:3000",
+})
+
+# Preflight headers that do not depend on the request (raw ASGI header pairs)
+_PREFLIGHT_HEADERS = [
+    (b"access-control-allow-methods", b"GET, POST, PUT, DELETE, OPTIONS"),
+    (b"access-control-max-age", b"86400"),  # 24 hours
 ]
 
 
-class OptionsHandlerMiddleware(BaseHTTPMiddleware):
+class OptionsHandlerMiddleware:
     """Handle OPTIONS preflight requests before FastAPI validation.
     
     This middleware intercepts OPTIONS requests and returns 204 with CORS headers
     before FastAPI can validate query parameters or route the request.
+    Written as plain ASGI (not BaseHTTPMiddleware) so other requests pass
+    straight through without an extra task per request.
     """
-    
-    async def dispatch(self, request: Request, call_next):
-        if request.method == "OPTIONS":
-            # Get origin from request
-            origin = request.headers.get("origin")
-            
-            # Build CORS headers
-            headers = {}
-            if origin in ALLOWED_ORIGINS:
-                headers["Access-Control-Allow-Origin"] = origin
-                headers["Access-Control-Allow-Credentials"] = "true"
-            
-            # Get requested method and headers from preflight
-            requested_method = request.headers.get("access-control-request-method", "GET, POST, PUT, DELETE, OPTIONS")
-            requested_headers = request.headers.get("access-control-request-headers", "*")
-            
-            headers["Access-Control-Allow-Methods"] = "GET, POST, PUT, DELETE, OPTIONS"
-            headers["Access-Control-Allow-Headers"] = requested_headers
-            headers["Access-Control-Max-Age"] = "86400"  # 24 hours
-            
-            # Return 204 No Content with CORS headers
-            return Response(status_code=204, headers=headers)
-        
-        return await call_next(request)
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http" or scope["method"] != "OPTIONS":
+            await self.app(scope, receive, send)
+            return
+
+        origin = None
+        requested_headers = b"*"
+        for name, value in scope["headers"]:
+            if name == b"origin":
+                origin = value
+            elif name == b"access-control-request-headers":
+                requested_headers = value
+
+        # Build CORS headers
+        headers = list(_PREFLIGHT_HEADERS)
+        if origin is not None and origin.decode("latin-1") in ALLOWED_ORIGINS:
+            headers.append((b"access-control-allow-origin", origin))
+            headers.append((b"access-control-allow-credentials", b"true"))
+        headers.append((b"access-control-allow-headers", requested_headers))
+
+        # Return 204 No Content with CORS headers
+        await send({"type": "http.response.start", "status": 204, "headers": headers})
+        await send({"type": "http.response.body", "body": b""})
 
 
 # CORS middleware must be added immediately after app creation, before routes
 # This handles CORS headers for non-OPTIONS requests
 app.add_middleware(
     CORSMiddleware,
-    allow_origins=ALLOWED_ORIGINS,
+    allow_origins=sorted(ALLOWED_ORIGINS),
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
@@ -124,22 +144,87 @@ app.add_middleware(
 # This intercepts OPTIONS before FastAPI validation
 app.add_middleware(OptionsHandlerMiddleware)
 
-# Load constituents once at startup (read from disk only)
-_constituents: list = []
+# Load constituents once at startup (read from disk only). The lookups and
+# summaries below are derived from them once, so routes never rescan the list.
+_index = ConstituentIndex([])
+_sectors_json: bytes = b"[]"
+_subsectors_json: dict[str, bytes] = {}
+_gate_sizer: Optional[asyncio.Task] = None
 
 
 @app.on_event("startup")
-def startup():
-    global _constituents
-    _constituents = load_constituents()
-    logger.info("Loaded %d constituents", len(_constituents))
+async def startup():
+    global _index, _sectors_json, _subsectors_json, _gate_sizer
+    _index = load_constituent_index()
+    # /api/sectors and /api/subsectors are pure functions of the constituents:
+    # validate and encode them once here, then serve the bytes
+    _sectors_json = _dumps([
+        SectorSummary(**r).model_dump() for r in _index.sectors_with_counts
+    ])
+    _subsectors_json = {
+        key: _dumps([SubIndustrySummary(**r).model_dump() for r in rows])
+        for key, rows in _index.subsectors_by_sector.items()
+    }
+    logger.info("Loaded %d constituents across %d sectors",
+                len(_index.constituents), len(_index.by_sector))
+    _gate_sizer = asyncio.create_task(
+        # Each gate slot is one _fetch_one: a quote and a profile, up to two tokens
+        size_gate_to_limiter(_FETCH_GATE, get_rate_limiter(), FETCH_CONCURRENCY, tokens_per_slot=2)
+    )
+
+
+@app.on_event("shutdown")
+async def shutdown():
+    if _gate_sizer is not None:
+        _gate_sizer.cancel()
+    await finnhub_client.close_client()
 
 
 def _constituents_list():
-    return _constituents
+    return _index.constituents
 
 
 # --- Helpers ---
+def _dumps(content: Any) -> bytes:
+    return orjson.dumps(content, option=orjson.OPT_UTC_Z)
+
+
+def _json_bytes_response(body: bytes) -> Response:
+    """Return already-encoded JSON as-is (no validation, no re-encoding)."""
+    return Response(content=body, media_type="application/json")
+
+
+def _json_response(content: Any) -> Response:
+    """
+    Serialize content with orjson and return it as-is.
+    Returning a Response skips FastAPI's response_model re-validation and stdlib
+    json encoding; response_model on the route is still used for the docs.
+    """
+    return _json_bytes_response(_dumps(content))
+
+
+def _sector_body(
+    sector: str,
+    updated_at: datetime,
+    companies: list[CompanyQuote],
+    meta: SectorMeta,
+    format: ResponseFormat,
+) -> bytes:
+    """Encode a SectorResponse (or SectorResponseCompact) without building the model."""
+    if format == "compact":
+        rows = list(map(_COMPANY_ROW, companies))
+        columns = zip(*rows) if rows else ([] for _ in _COMPANY_FIELDS)
+        companies_json: Any = dict(zip(_COMPANY_FIELDS, map(list, columns)))
+    else:
+        companies_json = companies  # orjson encodes the dataclasses directly
+    return _dumps({
+        "sector": sector,
+        "updated_at": updated_at,
+        "companies": companies_json,
+        "meta": meta.model_dump(),
+    })
+
+
 def _cap_limit(limit: Optional[int]) -> int:
     """Cap limit to valid range [1, MAX_COMPANIES_PER_REQUEST]. Logs warning if capped."""
     if limit is None:
@@ -154,17 +239,18 @@ def _company_quote_from_result(
     symbol: str,
     name: str,
     sub_industry: str,
-    result: dict,
-    source: str,
+    result: QuoteResult,
+    source: QuoteSource,
     market_cap: Optional[float] = None,
 ) -> CompanyQuote:
-    if result.get("status") == "error":
+    # Quotes come normalized from finnhub_client; CompanyQuote is a plain dataclass
+    if result.status == "error":
         return CompanyQuote(
             symbol=symbol,
             name=name,
             subIndustry=sub_industry,
             status="error",
-            error=result.get("error"),
+            error=result.error,
             source=source,
             marketCap=market_cap,
         )
@@ -172,27 +258,102 @@ def _company_quote_from_result(
         symbol=symbol,
         name=name,
         subIndustry=sub_industry,
-        close=result.get("close", 0.0),
-        prevClose=result.get("prevClose", 0.0),
-        open=result.get("open", 0.0),
-        high=result.get("high", 0.0),
-        low=result.get("low", 0.0),
-        change=result.get("change", 0.0),
-        pctChange=result.get("pctChange", 0.0),
+        close=result.close,
+        prevClose=result.prevClose,
+        open=result.open,
+        high=result.high,
+        low=result.low,
+        change=result.change,
+        pctChange=result.pctChange,
         marketCap=market_cap,
         status="ok",
         source=source,
     )
 
 
+async def _fetch_one(
+    c: ConstituentRow, refresh: bool
+) -> tuple[ConstituentRow, tuple[QuoteResult, str], tuple[dict, str]]:
+    """Fetch quote and profile for one constituent concurrently.
+
+    Neither call raises (errors come back as payloads), so one failing symbol
+    never cancels the rest of the fan-out.
+    """
+    async with _FETCH_GATE:
+        quote, profile = await asyncio.gather(
+            finnhub_client.get_quote(c.symbol, use_cache=True, refresh=refresh),
+            finnhub_client.get_company_profile(c.symbol, use_cache=True, refresh=refresh),
+        )
+    return c, quote, profile
+
+
+class _FanOutTally:
+    """Counters for one sector fan-out; add() folds in a single _fetch_one result."""
+
+    def __init__(self):
+        self.cache_hits = 0
+        self.cache_hits_stale = 0
+        self.api_calls = 0
+        self.rate_limited = False
+        self.ok_count = 0
+
+    def add(
+        self, c: ConstituentRow, quote: tuple[QuoteResult, str], profile: tuple[dict, str]
+    ) -> CompanyQuote:
+        payload, source = quote
+        if source == "cache":
+            self.cache_hits += 1
+        elif source == "stale_cache":
+            self.cache_hits_stale += 1
+            self.rate_limited = True
+        elif source == "finnhub":
+            self.api_calls += 1
+        if payload.status == "error":
+            if payload.error == "rate_limited":
+                self.rate_limited = True
+        else:
+            self.ok_count += 1
+
+        # Market cap is best-effort - if it fails, we still return quote data
+        market_cap = None
+        profile_payload, profile_source = profile
+        if profile_source == "finnhub":
+            self.api_calls += 1
+        if profile_payload.get("status") != "error":
+            market_cap = profile_payload.get("marketCap")
+
+        return _company_quote_from_result(
+            c.symbol, c.name, c.subIndustry, payload, source, market_cap
+        )
+
+    def meta(self, requested: int, returned: int) -> SectorMeta:
+        return SectorMeta(
+            requested=requested,
+            returned=returned,
+            cache_hits=self.cache_hits + self.cache_hits_stale,
+            api_calls=self.api_calls,
+            rate_limited=self.rate_limited,
+        )
+
+
+async def _fetch_companies(
+    to_fetch: list[ConstituentRow], refresh: bool
+) -> tuple[list[CompanyQuote], _FanOutTally]:
+    """
+    Fetch quotes + market caps for all constituents concurrently.
+    At most FETCH_CONCURRENCY symbols are in flight; the rate limiter and
+    semaphore in finnhub_client still govern outbound calls.
+    """
+    results = await asyncio.gather(*[_fetch_one(c, refresh) for c in to_fetch])
+    tally = _FanOutTally()
+    companies_out = [tally.add(c, quote, profile) for c, quote, profile in results]
+    return companies_out, tally
+
+
 # --- Routes ---
 @app.get("/health", response_model=HealthResponse)
 def health():
-    return HealthResponse(
-        ok=True,
-        ts=_utc_now(),
-        version=APP_VERSION,
-    )
+    return _json_response({"ok": True, "ts": _utc_now(), "version": APP_VERSION})
 
 
 def _utc_now() -> datetime:
@@ -210,62 +371,68 @@ async def get_index():
     symbol = "^GSPC"
     logger.debug("Fetching index quote for ^GSPC")
     payload, source = await finnhub_client.get_quote("^GSPC", use_cache=True, refresh=False)
-    if payload.get("status") == "error":
-        logger.info("^GSPC failed (%s), falling back to SPY", payload.get("error"))
+    if payload.status == "error":
+        logger.info("^GSPC failed (%s), falling back to SPY", payload.error)
         symbol = "SPY"
         payload, source = await finnhub_client.get_quote("SPY", use_cache=True, refresh=False)
 
-    if payload.get("status") == "error":
-        logger.error("Index fetch failed for %s: %s", symbol, payload.get("error"))
+    if payload.status == "error":
+        logger.error("Index fetch failed for %s: %s", symbol, payload.error)
         raise HTTPException(
             status_code=503,
-            detail={"reason": payload.get("error", "quote unavailable"), "symbol": symbol},
+            detail={"reason": payload.error or "quote unavailable", "symbol": symbol},
         )
 
     name = "S&P 500 (proxy)" if symbol == "SPY" else "S&P 500"
-    logger.info("Index quote for %s: source=%s, close=%.2f", symbol, source, payload.get("close", 0.0))
-    return IndexResponse(
-        symbol=symbol,
-        name=name,
-        close=payload.get("close", 0.0),
-        prevClose=payload.get("prevClose", 0.0),
-        change=payload.get("change", 0.0),
-        pctChange=payload.get("pctChange", 0.0),
-        ts=_utc_now(),
-        source=source,
-    )
+    logger.info("Index quote for %s: source=%s, close=%.2f", symbol, source, payload.close)
+    return _json_response({
+        "symbol": symbol,
+        "name": name,
+        "close": payload.close,
+        "prevClose": payload.prevClose,
+        "change": payload.change,
+        "pctChange": payload.pctChange,
+        "ts": _utc_now(),
+        "source": source,
+    })
 
 
 @app.get("/api/sectors", response_model=list[SectorSummary])
 def list_sectors():
     """List sectors with counts and sub-industry counts."""
-    rows = get_sectors_with_counts(_constituents_list())
-    return [SectorSummary(**r) for r in rows]
+    return _json_bytes_response(_sectors_json)
 
 
 @app.get("/api/subsectors/{sector}", response_model=list[SubIndustrySummary])
 def list_subsectors(sector: str):
     """List sub-industries within a sector with counts."""
-    rows = get_subsectors_for_sector(_constituents_list(), sector)
-    return [SubIndustrySummary(**r) for r in rows]
+    return _json_bytes_response(_subsectors_json.get(sector.strip().lower(), b"[]"))
 
 
-@app.get("/api/sector/{sector}", response_model=SectorResponse)
+@app.get("/api/sector/{sector}", response_model=Union[SectorResponse, SectorResponseCompact])
 async def get_sector(
     sector: str,
     limit: Optional[int] = Query(None, ge=1, le=MAX_COMPANIES_PER_REQUEST),
     refresh: bool = Query(False),
+    format: ResponseFormat = Query("full"),
 ):
     """
     Companies in sector with last close; optional limit and refresh.
+    format=compact returns companies as parallel field lists (SectorResponseCompact).
     On-demand fetching only - no prefetching.
     """
-    constituents = get_constituents_by_sector(_constituents_list(), sector)
+    constituents = _index.sector(sector)
     if not constituents:
         raise HTTPException(status_code=404, detail=f"Sector not found: {sector}")
 
     # Enforce per-request caps
     cap = _cap_limit(limit)
+    response_key = f"sector:{sector.strip().lower()}:{cap}:{format}"
+    if not refresh:
+        cached = _response_cache.get(response_key)
+        if cached and cached[1] == "cache":
+            return _json_bytes_response(cached[0])
+
     to_fetch = constituents[:cap]
     requested = len(to_fetch)
     total_available = len(constituents)
@@ -274,63 +441,24 @@ async def get_sector(
         logger.info("Sector %s: capping request to %d symbols (total available: %d)", 
                    sector, requested, total_available)
 
-    cache = get_quote_cache()
     limiter = get_rate_limiter()
-    cache_hits = 0
-    cache_hits_stale = 0
-    api_calls = 0
-    rate_limited = False
-    companies_out = []
     now_utc = _utc_now()
 
     logger.info("Fetching sector %s: %d symbols requested (refresh=%s)", 
                sector, requested, refresh)
 
-    # Process sequentially (sector-level batching)
-    for c in to_fetch:
-        payload, source = await finnhub_client.get_quote(
-            c.symbol, use_cache=True, refresh=refresh
-        )
-        if source == "cache":
-            cache_hits += 1
-        elif source == "stale_cache":
-            cache_hits_stale += 1
-            rate_limited = True
-        elif source == "finnhub":
-            api_calls += 1
-        if payload.get("status") == "error" and payload.get("error") == "rate_limited":
-            rate_limited = True
-        
-        # Fetch market cap (non-blocking - if it fails, we still return quote data)
-        market_cap = None
-        try:
-            profile_payload, profile_source = await finnhub_client.get_company_profile(
-                c.symbol, use_cache=True, refresh=refresh
-            )
-            if profile_source == "finnhub":
-                api_calls += 1
-            if profile_payload.get("status") != "error":
-                market_cap = profile_payload.get("marketCap")
-        except Exception as e:
-            logger.warning("Failed to fetch market cap for %s: %s", c.symbol, e)
-        
-        companies_out.append(
-            _company_quote_from_result(
-                c.symbol, c.name, c.subIndustry, payload, source, market_cap
-            )
-        )
+    companies_out, tally = await _fetch_companies(to_fetch, refresh)
 
     # Log summary
-    limiter_stats = await limiter.get_stats()
-    cache_stats = cache.get_stats()
+    limiter_stats = limiter.get_stats()
     logger.info(
         "Sector %s fetch complete: requested=%d, cache_hits=%d (fresh=%d, stale=%d), "
         "api_calls=%d, rate_limited=%s, tokens_remaining=%.2f",
-        sector, requested, cache_hits + cache_hits_stale, cache_hits, cache_hits_stale,
-        api_calls, rate_limited, limiter_stats["tokens_remaining"]
+        sector, requested, tally.cache_hits + tally.cache_hits_stale, tally.cache_hits,
+        tally.cache_hits_stale, tally.api_calls, tally.rate_limited, limiter_stats["tokens_remaining"]
     )
 
-    if rate_limited and cache_hits == 0 and cache_hits_stale == 0 and all(co.status == "error" for co in companies_out):
+    if tally.rate_limited and tally.cache_hits == 0 and tally.cache_hits_stale == 0 and tally.ok_count == 0:
         raise HTTPException(
             status_code=429,
             detail={
@@ -339,34 +467,67 @@ async def get_sector(
             },
         )
 
-    return SectorResponse(
-        sector=sector,
-        updated_at=now_utc,
-        companies=companies_out,
-        meta=SectorMeta(
-            requested=requested,
-            returned=len(companies_out),
-            cache_hits=cache_hits + cache_hits_stale,
-            api_calls=api_calls,
-            rate_limited=rate_limited,
-        ),
+    body = _sector_body(
+        sector, now_utc, companies_out, tally.meta(requested, len(companies_out)), format
     )
+    if not tally.rate_limited:
+        _response_cache.set(response_key, body)
+    return _json_bytes_response(body)
 
 
-@app.get("/api/subsector/{sector}/{sub_industry}", response_model=SectorResponse)
+@app.get("/api/sector/{sector}/stream")
+async def stream_sector(
+    sector: str,
+    limit: Optional[int] = Query(None, ge=1, le=MAX_COMPANIES_PER_REQUEST),
+    refresh: bool = Query(False),
+):
+    """
+    Same data as /api/sector/{sector}, streamed as NDJSON.
+    One CompanyQuote per line in completion order, then a final {"meta": ...} line,
+    so clients can render the first tiles before the whole fan-out finishes.
+    """
+    constituents = _index.sector(sector)
+    if not constituents:
+        raise HTTPException(status_code=404, detail=f"Sector not found: {sector}")
+
+    to_fetch = constituents[:_cap_limit(limit)]
+    logger.info("Streaming sector %s: %d symbols requested (refresh=%s)",
+               sector, len(to_fetch), refresh)
+
+    async def _lines():
+        tally = _FanOutTally()
+        returned = 0
+        tasks = [asyncio.ensure_future(_fetch_one(c, refresh)) for c in to_fetch]
+        try:
+            for next_result in asyncio.as_completed(tasks):
+                company = tally.add(*await next_result)
+                returned += 1
+                yield _dumps(company) + b"\n"
+        finally:
+            # Client went away (or the stream failed): stop fetches nobody will read
+            for task in tasks:
+                task.cancel()
+        yield _dumps({"meta": tally.meta(len(to_fetch), returned).model_dump()}) + b"\n"
+
+    return StreamingResponse(_lines(), media_type="application/x-ndjson")
+
+
+@app.get(
+    "/api/subsector/{sector}/{sub_industry}",
+    response_model=Union[SectorResponse, SectorResponseCompact],
+)
 async def get_subsector(
     sector: str,
     sub_industry: str,
     limit: Optional[int] = Query(None, ge=1, le=MAX_COMPANIES_PER_REQUEST),
     refresh: bool = Query(False),
+    format: ResponseFormat = Query("full"),
 ):
     """
-    Companies in sector + sub-industry with last close.
+    Companies in sector + sub-industry with last close (format as for /api/sector).
     On-demand fetching only - no prefetching.
     """
-    constituents = get_constituents_by_subsector(
-        _constituents_list(), sector, sub_industry
-    )
+    constituents = _index.subsector(sector, sub_industry)
     if not constituents:
         raise HTTPException(
             status_code=404,
@@ -375,6 +536,12 @@ async def get_subsector(
 
     # Enforce per-request caps
     cap = _cap_limit(limit)
+    response_key = f"subsector:{sector.strip().lower()}:{sub_industry.strip().lower()}:{cap}:{format}"
+    if not refresh:
+        cached = _response_cache.get(response_key)
+        if cached and cached[1] == "cache":
+            return _json_bytes_response(cached[0])
+
     to_fetch = constituents[:cap]
     requested = len(to_fetch)
     total_available = len(constituents)
@@ -383,63 +550,24 @@ async def get_subsector(
         logger.info("Subsector %s/%s: capping request to %d symbols (total available: %d)", 
                    sector, sub_industry, requested, total_available)
 
-    cache = get_quote_cache()
     limiter = get_rate_limiter()
-    cache_hits = 0
-    cache_hits_stale = 0
-    api_calls = 0
-    rate_limited = False
-    companies_out = []
     now_utc = _utc_now()
 
     logger.info("Fetching subsector %s/%s: %d symbols requested (refresh=%s)", 
                sector, sub_industry, requested, refresh)
 
-    # Process sequentially (sector-level batching)
-    for c in to_fetch:
-        payload, source = await finnhub_client.get_quote(
-            c.symbol, use_cache=True, refresh=refresh
-        )
-        if source == "cache":
-            cache_hits += 1
-        elif source == "stale_cache":
-            cache_hits_stale += 1
-            rate_limited = True
-        elif source == "finnhub":
-            api_calls += 1
-        if payload.get("status") == "error" and payload.get("error") == "rate_limited":
-            rate_limited = True
-        
-        # Fetch market cap (non-blocking - if it fails, we still return quote data)
-        market_cap = None
-        try:
-            profile_payload, profile_source = await finnhub_client.get_company_profile(
-                c.symbol, use_cache=True, refresh=refresh
-            )
-            if profile_source == "finnhub":
-                api_calls += 1
-            if profile_payload.get("status") != "error":
-                market_cap = profile_payload.get("marketCap")
-        except Exception as e:
-            logger.warning("Failed to fetch market cap for %s: %s", c.symbol, e)
-        
-        companies_out.append(
-            _company_quote_from_result(
-                c.symbol, c.name, c.subIndustry, payload, source, market_cap
-            )
-        )
+    companies_out, tally = await _fetch_companies(to_fetch, refresh)
 
     # Log summary
-    limiter_stats = await limiter.get_stats()
-    cache_stats = cache.get_stats()
+    limiter_stats = limiter.get_stats()
     logger.info(
         "Subsector %s/%s fetch complete: requested=%d, cache_hits=%d (fresh=%d, stale=%d), "
         "api_calls=%d, rate_limited=%s, tokens_remaining=%.2f",
-        sector, sub_industry, requested, cache_hits + cache_hits_stale, cache_hits, cache_hits_stale,
-        api_calls, rate_limited, limiter_stats["tokens_remaining"]
+        sector, sub_industry, requested, tally.cache_hits + tally.cache_hits_stale, tally.cache_hits,
+        tally.cache_hits_stale, tally.api_calls, tally.rate_limited, limiter_stats["tokens_remaining"]
     )
 
-    if rate_limited and cache_hits == 0 and cache_hits_stale == 0 and all(co.status == "error" for co in companies_out):
+    if tally.rate_limited and tally.cache_hits == 0 and tally.cache_hits_stale == 0 and tally.ok_count == 0:
         raise HTTPException(
             status_code=429,
             detail={
@@ -448,28 +576,22 @@ async def get_subsector(
             },
         )
 
-    return SectorResponse(
-        sector=sector,
-        updated_at=now_utc,
-        companies=companies_out,
-        meta=SectorMeta(
-            requested=requested,
-            returned=len(companies_out),
-            cache_hits=cache_hits + cache_hits_stale,
-            api_calls=api_calls,
-            rate_limited=rate_limited,
-        ),
+    body = _sector_body(
+        sector, now_utc, companies_out, tally.meta(requested, len(companies_out)), format
     )
+    if not tally.rate_limited:
+        _response_cache.set(response_key, body)
+    return _json_bytes_response(body)
 
 
-@app.get("/api/search", response_model=list)
+@app.get("/api/search", response_model=list[SearchResult])
 def search(q: str = Query(..., min_length=1), limit: int = Query(50, ge=1, le=100)):
     """Search constituents by symbol or name. No Finnhub calls."""
-    results = search_constituents(_constituents_list(), q, limit=limit)
-    return [
+    results = search_constituents(_constituents_list(), q, limit=limit, index=_index)
+    return _json_response([
         {"symbol": c.symbol, "name": c.name, "sector": c.sector, "subIndustry": c.subIndustry}
         for c in results
-    ]
+    ])
 
 
 # Optional: return 429 when rate limited and no stale cache (handled inside get_quote by returning error in payload)
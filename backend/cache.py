@@ -1,26 +1,55 @@
 """TTL cache for quote responses with optional stale fallback."""
 
+import asyncio
 import logging
 import os
 import time
-from typing import Any, Optional
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Final, Optional
 
 logger = logging.getLogger(__name__)
 
 DEFAULT_TTL = int(os.environ.get("QUOTE_CACHE_TTL_SECONDS", "300"))
+# Company profiles (market cap) change slowly; cache them far longer than quotes
+PROFILE_TTL = int(os.environ.get("PROFILE_CACHE_TTL_SECONDS", "86400"))
+DEFAULT_MAXSIZE = int(os.environ.get("QUOTE_CACHE_MAXSIZE", "4096"))
+_NS_PER_SECOND = 1_000_000_000
+# Per-prefix counter slots: [fresh hits, stale hits, misses]
+_FRESH, _STALE, _MISS = 0, 1, 2
+_CACHE_SRC = "cache"
+_STALE_SRC = "stale_cache"
+# Sources a coalesced caller keeps as-is: they say no fresh value was fetched
+_PASSTHROUGH_SRCS = frozenset((_STALE_SRC, "error"))
+
+
+def _is_error_payload(value: Any) -> bool:
+    """Failed fetches come back as status="error" payloads (QuoteResult or profile dict)."""
+    status = value.get("status") if isinstance(value, dict) else getattr(value, "status", None)
+    return status == "error"
 
 
 class QuoteCache:
-    """In-memory TTL cache. Stores (value, expiry_ts). Serves stale if requested."""
+    """
+    In-memory TTL cache. Stores (value, expiry_ns, drop_ns). Serves stale if requested.
+    Expiries are integer time.monotonic_ns() values, so the hot path does int compares.
+    Bounded to maxsize entries; the least recently used entry is evicted first.
+    Entries older than twice their TTL are too stale to serve and are dropped lazily.
+    """
 
-    def __init__(self, ttl_seconds: Optional[int] = None):
+    def __init__(self, ttl_seconds: Optional[int] = None, maxsize: Optional[int] = None):
         self._ttl = ttl_seconds if ttl_seconds is not None else DEFAULT_TTL
-        self._store: dict[str, tuple[Any, float]] = {}
-        self._hits_fresh = 0
-        self._hits_stale = 0
-        self._misses = 0
+        self._ttl_ns = self._ttl * _NS_PER_SECOND
+        self._maxsize = max(1, maxsize if maxsize is not None else DEFAULT_MAXSIZE)
+        self._store: OrderedDict[str, tuple[Any, int, int]] = OrderedDict()  # key -> (value, expiry_ns, drop_ns)
+        self._inflight: dict[str, asyncio.Future] = {}  # key -> shared fetch task
         self._sets = 0
-        logger.info("QuoteCache initialized: TTL=%d seconds", self._ttl)
+        self._coalesced = 0
+        self._evictions = 0
+        self._expired = 0
+        # "quote" / "profile" / ... -> [fresh, stale, miss], for tuning TTLs per key type;
+        # also the only hit/miss counters, the totals are summed in get_stats
+        self._by_prefix: dict[str, list[int]] = {}
+        logger.info("QuoteCache initialized: TTL=%d seconds, maxsize=%d", self._ttl, self._maxsize)
 
     def get(self, key: str) -> Optional[tuple[Any, str]]:
         """
@@ -28,42 +57,141 @@ class QuoteCache:
         Returns (value, source) where source is "cache" or "stale_cache", or None if not found.
         """
         entry = self._store.get(key)
-        if not entry:
-            self._misses += 1
+        counts = self._prefix_counts(key)
+        debug = logger.isEnabledFor(logging.DEBUG)
+        if entry is not None:
+            value, expiry, drop_at = entry
+            now = time.monotonic_ns()
+            if now <= expiry:
+                self._store.move_to_end(key)
+                counts[_FRESH] += 1
+                if debug:
+                    logger.debug("Quote cache HIT (fresh) for %s", key)
+                return (value, _CACHE_SRC)
+            if now <= drop_at:
+                # Expired but recent enough to serve as stale
+                self._store.move_to_end(key)
+                counts[_STALE] += 1
+                if debug:
+                    logger.debug("Quote cache HIT (stale) for %s", key)
+                return (value, _STALE_SRC)
+            del self._store[key]
+            self._expired += 1
+            if debug:
+                logger.debug("Quote cache EXPIRED for %s (older than 2x TTL)", key)
+        counts[_MISS] += 1
+        if debug:
             logger.debug("Quote cache MISS for %s", key)
+        return None
+
+    def peek(self, key: str) -> Any:
+        """
+        Return the stored value for key (fresh or stale), or None if absent or older than
+        2x TTL, without touching stats or LRU order.
+        """
+        entry = self._store.get(key)
+        if entry is None or time.monotonic_ns() > entry[2]:
             return None
-        value, expiry = entry
-        now = time.monotonic()
-        if now <= expiry:
-            self._hits_fresh += 1
-            logger.debug("Quote cache HIT (fresh) for %s", key)
-            return (value, "cache")
-        # Expired but we have stale data
-        self._hits_stale += 1
-        logger.debug("Quote cache HIT (stale) for %s", key)
-        return (value, "stale_cache")
-
-    def set(self, key: str, value: Any) -> None:
-        """Store value with TTL from now."""
-        expiry = time.monotonic() + self._ttl
-        self._store[key] = (value, expiry)
+        return entry[0]
+
+    def _prefix_counts(self, key: str) -> list[int]:
+        prefix = key.partition(":")[0]
+        counts = self._by_prefix.get(prefix)
+        if counts is None:
+            counts = self._by_prefix[prefix] = [0, 0, 0]
+        return counts
+
+    def set(self, key: str, value: Any, ttl_seconds: Optional[int] = None) -> None:
+        """Store value with TTL from now (ttl_seconds overrides the cache default)."""
+        ttl_ns = ttl_seconds * _NS_PER_SECOND if ttl_seconds is not None else self._ttl_ns
+        now = time.monotonic_ns()
+        self._store[key] = (value, now + ttl_ns, now + 2 * ttl_ns)
+        self._store.move_to_end(key)
         self._sets += 1
-        logger.debug("Quote cache SET for %s (expires in %d seconds)", key, self._ttl)
+        debug = logger.isEnabledFor(logging.DEBUG)
+        # Opportunistic sweep: least recently used entries sit at the front
+        while self._store:
+            oldest = next(iter(self._store))
+            if now <= self._store[oldest][2]:
+                break
+            del self._store[oldest]
+            self._expired += 1
+            if debug:
+                logger.debug("Quote cache EXPIRED for %s (older than 2x TTL)", oldest)
+        while len(self._store) > self._maxsize:
+            evicted, _ = self._store.popitem(last=False)
+            self._evictions += 1
+            if debug:
+                logger.debug("Quote cache EVICT for %s (maxsize=%d)", evicted, self._maxsize)
+        if debug:
+            logger.debug("Quote cache SET for %s (expires in %d seconds)", key, ttl_ns // _NS_PER_SECOND)
+
+    async def get_or_fetch(
+        self,
+        key: str,
+        fetcher: Callable[[], Awaitable[tuple[Any, str]]],
+        *,
+        use_cache: bool = True,
+    ) -> tuple[Any, str]:
+        """
+        Return fresh cached value for key, or run fetcher once for all concurrent callers.
+        The fetch runs as its own task that every caller shields, so cancelling any one
+        caller (the first included) never cancels the fetch or fails the others.
+        Callers that joined an in-flight fetch get source "cache" for a successful value:
+        they made no call of their own. Error payloads keep the first caller's source.
+        fetcher returns (value, source) and caches what it fetched.
+        """
+        if use_cache:
+            cached = self.get(key)
+            if cached and cached[1] == _CACHE_SRC:
+                return cached
+
+        task = self._inflight.get(key)
+        if task is None:
+            task = asyncio.ensure_future(fetcher())
+            self._inflight[key] = task
+            task.add_done_callback(lambda t: self._fetch_done(key, t))
+            return await asyncio.shield(task)
+
+        self._coalesced += 1
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug("Quote cache COALESCE for %s (fetch already in flight)", key)
+        value, source = await asyncio.shield(task)
+        if source in _PASSTHROUGH_SRCS or _is_error_payload(value):
+            return (value, source)
+        return (value, _CACHE_SRC)
+
+    def _fetch_done(self, key: str, task: asyncio.Future) -> None:
+        if self._inflight.get(key) is task:
+            del self._inflight[key]
+        if not task.cancelled():
+            task.exception()  # mark retrieved even if every caller was cancelled
 
     def delete(self, key: str) -> None:
         """Remove key from cache."""
         self._store.pop(key, None)
-        logger.debug("Quote cache DELETE for %s", key)
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug("Quote cache DELETE for %s", key)
 
     def get_stats(self) -> dict:
         """Return cache statistics for logging/debugging."""
+        by_prefix = self._by_prefix.values()
         return {
             "size": len(self._store),
-            "hits_fresh": self._hits_fresh,
-            "hits_stale": self._hits_stale,
-            "misses": self._misses,
+            "hits_fresh": sum(c[_FRESH] for c in by_prefix),
+            "hits_stale": sum(c[_STALE] for c in by_prefix),
+            "misses": sum(c[_MISS] for c in by_prefix),
             "sets": self._sets,
+            "evictions": self._evictions,
+            "expired": self._expired,
+            "coalesced": self._coalesced,
+            "inflight": len(self._inflight),
             "ttl_seconds": self._ttl,
+            "maxsize": self._maxsize,
+            "by_prefix": {
+                prefix: {"hits_fresh": c[_FRESH], "hits_stale": c[_STALE], "misses": c[_MISS]}
+                for prefix, c in self._by_prefix.items()
+            },
         }
 
     @property
@@ -71,12 +199,10 @@ class QuoteCache:
         return self._ttl
 
 
-# Singleton used by app and finnhub_client
-quote_cache: Optional["QuoteCache"] = None
+# Singleton used by app and finnhub_client, created at import so concurrent
+# first callers cannot race to build two caches
+quote_cache: Final[QuoteCache] = QuoteCache()
 
 
 def get_quote_cache() -> QuoteCache:
-    global quote_cache
-    if quote_cache is None:
-        quote_cache = QuoteCache()
     return quote_cache
@@ -1,28 +1,44 @@
 """Load and query S&P 500 constituents from local JSON."""
 
-import json
 import logging
+import re
 from pathlib import Path
-from typing import Optional
+from typing import NamedTuple, Optional
 
-from models import Constituent
+import orjson
 
 logger = logging.getLogger(__name__)
 
 # Default path relative to this file
 DEFAULT_DATA_PATH = Path(__file__).resolve().parent / "data" / "sp500_constituents.json"
 
+_NAME_TOKEN_SPLIT = re.compile(r"[^a-z0-9]+")
 
-def load_constituents(path: Optional[Path] = None) -> list[Constituent]:
-    """Load constituents from JSON file. Returns empty list on error."""
+
+class ConstituentRow(NamedTuple):
+    """One constituent (from local JSON), held as a plain tuple."""
+
+    symbol: str
+    name: str
+    sector: str
+    subIndustry: str
+
+
+def load_constituents(path: Optional[Path] = None) -> list[ConstituentRow]:
+    """
+    Load constituents from JSON file. Returns empty list on error.
+    The file is a trusted local asset, so rows are built without validation.
+    """
     p = path or DEFAULT_DATA_PATH
     try:
-        with open(p, encoding="utf-8") as f:
-            raw = json.load(f)
-        if isinstance(raw, list):
-            return [Constituent(**item) for item in raw]
+        raw = orjson.loads(Path(p).read_bytes())
         if isinstance(raw, dict) and "constituents" in raw:
-            return [Constituent(**item) for item in raw["constituents"]]
+            raw = raw["constituents"]
+        if isinstance(raw, list):
+            return [
+                ConstituentRow(item["symbol"], item["name"], item["sector"], item["subIndustry"])
+                for item in raw
+            ]
         return []
     except Exception as e:
         logger.exception("Failed to load constituents from %s: %s", p, e)
@@ -30,45 +46,52 @@ def load_constituents(path: Optional[Path] = None) -> list[Constituent]:
 
 
 def get_constituents_by_sector(
-    constituents: list[Constituent], sector: str
-) -> list[Constituent]:
+    constituents: list[ConstituentRow], sector: str
+) -> list[ConstituentRow]:
     """Return constituents in the given sector (case-insensitive match)."""
     sector_lower = sector.strip().lower()
     return [c for c in constituents if c.sector.lower() == sector_lower]
 
 
-def get_constituents_by_subsector(
-    constituents: list[Constituent], sector: str, sub_industry: str
-) -> list[Constituent]:
-    """Return constituents in the given sector and sub-industry."""
-    sector_list = get_constituents_by_sector(constituents, sector)
-    sub_lower = sub_industry.strip().lower()
-    return [c for c in sector_list if c.subIndustry.lower() == sub_lower]
-
+def index_by_sector(constituents: list[ConstituentRow]) -> dict[str, list[ConstituentRow]]:
+    """Group constituents by lowercased sector, for O(1) case-insensitive lookup."""
+    index: dict[str, list[ConstituentRow]] = {}
+    for c in constituents:
+        index.setdefault(c.sector.lower(), []).append(c)
+    return index
 
-def get_sectors_with_counts(constituents: list[Constituent]) -> list[dict]:
-    """Return list of {sector, count, subIndustryCount}."""
-    from collections import defaultdict
 
-    sector_to_constituents: dict[str, list[Constituent]] = defaultdict(list)
+def index_by_subsector(
+    constituents: list[ConstituentRow],
+) -> dict[tuple[str, str], list[ConstituentRow]]:
+    """Group constituents by lowercased (sector, sub-industry)."""
+    index: dict[tuple[str, str], list[ConstituentRow]] = {}
     for c in constituents:
-        sector_to_constituents[c.sector].append(c)
+        index.setdefault((c.sector.lower(), c.subIndustry.lower()), []).append(c)
+    return index
+
 
-    result = []
-    for sector, members in sorted(sector_to_constituents.items()):
-        sub_industries = {c.subIndustry for c in members}
-        result.append(
-            {
-                "sector": sector,
-                "count": len(members),
-                "subIndustryCount": len(sub_industries),
-            }
-        )
-    return result
+def _count_sectors(sectors: list[str], sub_industries: list[str]) -> list[dict]:
+    """Return list of {sector, count, subIndustryCount} from parallel sector / sub-industry columns."""
+    from collections import Counter, defaultdict
+
+    sector_count = Counter(sectors)
+    sector_subs: dict[str, set[str]] = defaultdict(set)
+    for sector, sub in zip(sectors, sub_industries):
+        sector_subs[sector].add(sub)
+
+    return [
+        {
+            "sector": sector,
+            "count": sector_count[sector],
+            "subIndustryCount": len(sector_subs[sector]),
+        }
+        for sector in sorted(sector_count)
+    ]
 
 
 def get_subsectors_for_sector(
-    constituents: list[Constituent], sector: str
+    constituents: list[ConstituentRow], sector: str
 ) -> list[dict]:
     """Return list of {subIndustry, count} for the given sector."""
     sector_list = get_constituents_by_sector(constituents, sector)
@@ -78,17 +101,102 @@ def get_subsectors_for_sector(
     return [{"subIndustry": sub, "count": n} for sub, n in sorted(counts.items())]
 
 
+def build_search_index(constituents: list[ConstituentRow]) -> dict[str, list[ConstituentRow]]:
+    """
+    Map every prefix of each lowercased symbol and name word to its constituents.
+    Symbol matches come first, then name matches, each in file order, deduplicated.
+    """
+    index: dict[str, list[ConstituentRow]] = {}
+    seen: dict[str, set[str]] = {}
+
+    def add(prefix_source: str, c: ConstituentRow) -> None:
+        for i in range(1, len(prefix_source) + 1):
+            prefix = prefix_source[:i]
+            members = seen.setdefault(prefix, set())
+            if c.symbol not in members:
+                members.add(c.symbol)
+                index.setdefault(prefix, []).append(c)
+
+    for c in constituents:
+        add(c.symbol.lower(), c)
+    for c in constituents:
+        for token in _NAME_TOKEN_SPLIT.split(c.name.lower()):
+            if token:
+                add(token, c)
+    return index
+
+
+class ConstituentIndex:
+    """
+    Constituents plus every lookup table the API needs, built once at load.
+    Keys and search strings are lowercased here so queries never call .lower() per row.
+    """
+
+    def __init__(self, constituents: list[ConstituentRow]):
+        self.constituents = constituents
+        self.by_sector = index_by_sector(constituents)
+        self.by_subsector = index_by_subsector(constituents)
+        self.prefixes = build_search_index(constituents)
+        # Column layout: scans and aggregations touch one or two fields, so keep
+        # each as its own list and project back to rows by position
+        self.symbols_lower = [c.symbol.lower() for c in constituents]
+        self.names_lower = [c.name.lower() for c in constituents]
+        self.sectors = [c.sector for c in constituents]
+        self.sub_industries = [c.subIndustry for c in constituents]
+        # Aggregations are fixed for the life of the dataset, so compute them once
+        self.sectors_with_counts = _count_sectors(self.sectors, self.sub_industries)
+        self.subsectors_by_sector = {
+            key: get_subsectors_for_sector(members, key)
+            for key, members in self.by_sector.items()
+        }
+
+    def sector(self, sector: str) -> list[ConstituentRow]:
+        return self.by_sector.get(sector.strip().lower(), [])
+
+    def subsector(self, sector: str, sub_industry: str) -> list[ConstituentRow]:
+        return self.by_subsector.get((sector.strip().lower(), sub_industry.strip().lower()), [])
+
+
+def load_constituent_index(path: Optional[Path] = None) -> ConstituentIndex:
+    """Load constituents and build their ConstituentIndex."""
+    return ConstituentIndex(load_constituents(path))
+
+
 def search_constituents(
-    constituents: list[Constituent], query: str, limit: int = 50
-) -> list[Constituent]:
-    """Search by symbol or name (case-insensitive). No Finnhub calls."""
+    constituents: list[ConstituentRow],
+    query: str,
+    limit: int = 50,
+    index: Optional[ConstituentIndex] = None,
+) -> list[ConstituentRow]:
+    """
+    Search by symbol or name (case-insensitive). No Finnhub calls.
+    With a ConstituentIndex, symbol/name-word prefix matches come first from one lookup;
+    if they fall short of limit, the rest are topped up with substring matches from its
+    pre-lowercased columns. Without one, scan constituents (substring only, file order).
+    """
     q = (query or "").strip().lower()
     if not q:
         return []
-    matches = []
-    for c in constituents:
-        if q in c.symbol.lower() or q in c.name.lower():
-            matches.append(c)
-        if len(matches) >= limit:
-            break
+    matches: list[ConstituentRow] = []
+    seen: set[str] = set()
+    if index is not None:
+        hits = index.prefixes.get(q)
+        if hits:
+            if len(hits) >= limit:
+                return hits[:limit]
+            # Too few prefix matches: top up with the other substring matches
+            matches = list(hits)
+            seen = {c.symbol for c in hits}
+        rows = index.constituents
+        symbols, names = index.symbols_lower, index.names_lower
+    else:
+        # Lowercase lazily: the scan usually stops at limit long before the last row
+        rows = constituents
+        symbols = (c.symbol.lower() for c in constituents)
+        names = (c.name.lower() for c in constituents)
+    for i, (sym, name) in enumerate(zip(symbols, names)):
+        if (q in sym or q in name) and rows[i].symbol not in seen:
+            matches.append(rows[i])
+            if len(matches) >= limit:
+                break
     return matches
@@ -4,17 +4,20 @@ This is the CENTRALIZED API CLIENT - all Finnhub calls must go through this modu
 All requests pass through:
 - rate limiter (token bucket)
 - concurrency limiter (semaphore)
+- one shared HTTP/2 client (pooled keep-alive connections)
 - cache layer (TTL-based)
 """
 
 import asyncio
+import functools
 import logging
 import os
-from typing import Any, Optional
+import sys
+from typing import Any, NamedTuple, Optional
 
 import httpx
 
-from cache import get_quote_cache
+from cache import PROFILE_TTL, get_quote_cache
 from limiter import get_rate_limiter
 
 logger = logging.getLogger(__name__)
@@ -25,193 +28,246 @@ FINNHUB_PROFILE_PATH = "/api/v1/stock/profile2"
 DEFAULT_MAX_CONCURRENT = int(os.environ.get("FINNHUB_MAX_CONCURRENT", "5"))
 DEFAULT_TIMEOUT = float(os.environ.get("FINNHUB_TIMEOUT_SECONDS", "15.0"))
 MAX_RETRIES = 2  # Maximum 2 retries (3 total attempts)
+# Revalidate expired quotes with If-None-Match when Finnhub sent an ETag
+USE_ETAG = os.environ.get("FINNHUB_USE_ETAG", "").strip().lower() in ("1", "true", "yes")
+# Connection pool size; the semaphore below is clamped to it so tasks never
+# queue on pool acquisition while holding a semaphore slot
+MAX_CONNECTIONS = int(os.environ.get("FINNHUB_POOL_SIZE", str(DEFAULT_MAX_CONCURRENT * 2)))
+MAX_KEEPALIVE_CONNECTIONS = min(DEFAULT_MAX_CONCURRENT, MAX_CONNECTIONS)
 
 # Global semaphore for concurrent quote requests
 _semaphore: Optional[asyncio.Semaphore] = None
+# Shared HTTP client so requests reuse pooled keep-alive connections
+_client: Optional[httpx.AsyncClient] = None
 _api_call_count = 0  # Track total API calls for logging
+# Last ETag seen per quote cache key (only populated when USE_ETAG)
+_quote_etags: dict[str, str] = {}
+
+
+@functools.lru_cache(maxsize=2048)
+def _quote_key(symbol: str) -> str:
+    """Cache key for symbol's quote, built and interned once per symbol."""
+    return sys.intern(f"quote:{symbol.upper()}")
+
+
+@functools.lru_cache(maxsize=2048)
+def _profile_key(symbol: str) -> str:
+    """Cache key for symbol's company profile, built and interned once per symbol."""
+    return sys.intern(f"profile:{symbol.upper()}")
+
+
+@functools.cache
+def _api_key() -> str:
+    """FINNHUB_API_KEY, read once (call _api_key.cache_clear() after changing it)."""
+    return os.environ.get("FINNHUB_API_KEY", "").strip()
 
 
 def _get_semaphore() -> asyncio.Semaphore:
     """Get or create the global semaphore for concurrency control."""
     global _semaphore
     if _semaphore is None:
-        _semaphore = asyncio.Semaphore(DEFAULT_MAX_CONCURRENT)
-        logger.info("Concurrency semaphore initialized: max_concurrent=%d", DEFAULT_MAX_CONCURRENT)
+        max_concurrent = min(DEFAULT_MAX_CONCURRENT, MAX_CONNECTIONS)
+        if max_concurrent < DEFAULT_MAX_CONCURRENT:
+            logger.warning("FINNHUB_MAX_CONCURRENT=%d exceeds FINNHUB_POOL_SIZE=%d; clamping",
+                           DEFAULT_MAX_CONCURRENT, MAX_CONNECTIONS)
+        _semaphore = asyncio.Semaphore(max_concurrent)
+        logger.info("Concurrency semaphore initialized: max_concurrent=%d", max_concurrent)
     return _semaphore
 
 
-def _parse_quote_response(data: dict, symbol: str) -> dict[str, Any]:
-    """Build normalized quote dict: close, prevClose, open, high, low, change, pctChange."""
-    c = float(data.get("c") or 0)
-    pc = float(data.get("pc") or 0)
-    o = float(data.get("o") or 0)
-    h = float(data.get("h") or 0)
-    l = float(data.get("l") or 0)
-    change = c - pc if pc is not None else 0.0
-    pct_change = (change / pc * 100) if pc and pc != 0 else 0.0
-    return {
-        "close": c,
-        "prevClose": pc,
-        "open": o,
-        "high": h,
-        "low": l,
-        "change": change,
-        "pctChange": round(pct_change, 4),
-    }
+def _get_client() -> httpx.AsyncClient:
+    """Get or create the shared HTTP/2 client (one connection pool per process)."""
+    global _client
+    if _client is None:
+        _client = httpx.AsyncClient(
+            base_url=FINNHUB_BASE_URL,
+            timeout=DEFAULT_TIMEOUT,
+            http2=True,
+            limits=httpx.Limits(
+                max_connections=MAX_CONNECTIONS,
+                max_keepalive_connections=MAX_KEEPALIVE_CONNECTIONS,
+            ),
+        )
+        logger.info("HTTP client initialized: max_connections=%d, keepalive=%d",
+                    MAX_CONNECTIONS, MAX_KEEPALIVE_CONNECTIONS)
+    return _client
 
 
-async def fetch_company_profile(symbol: str) -> dict[str, Any]:
+async def close_client() -> None:
+    """Close the shared HTTP client (call on app shutdown)."""
+    global _client
+    if _client is not None:
+        await _client.aclose()
+        _client = None
+
+
+class QuoteResult(NamedTuple):
+    """Normalized quote (or error) with defaults baked in; cached as-is."""
+
+    status: str = "ok"  # "ok" | "error" | "not_modified" (304, fetch_quote only)
+    close: float = 0.0
+    prevClose: float = 0.0
+    open: float = 0.0
+    high: float = 0.0
+    low: float = 0.0
+    change: float = 0.0
+    pctChange: float = 0.0
+    error: Optional[str] = None
+
+
+def _parse_quote_response(data: dict, symbol: str) -> QuoteResult:
+    """Build normalized quote: close, prevClose, open, high, low, change, pctChange."""
+    # Finnhub sends floats (or null for unknown symbols); only coerce ints/strings
+    get = data.get
+    c = get("c") or 0.0
+    pc = get("pc") or 0.0
+    o = get("o") or 0.0
+    h = get("h") or 0.0
+    l = get("l") or 0.0
+    if type(c) is not float or type(pc) is not float:
+        c, pc = float(c), float(pc)
+    if type(o) is not float or type(h) is not float or type(l) is not float:
+        o, h, l = float(o), float(h), float(l)
+    change = c - pc
+    pct_change = change / pc * 100.0 if pc else 0.0
+    return QuoteResult("ok", c, pc, o, h, l, change, round(pct_change, 4))
+
+
+async def _get_with_retries(
+    path: str,
+    symbol: str,
+    what: str,
+    headers: Optional[dict[str, str]] = None,
+) -> tuple[Optional[httpx.Response], Optional[str]]:
     """
-    Fetch company profile from Finnhub to get market cap.
-    Returns dict with marketCap (in USD) or error fields.
+    GET path for symbol with retries (max 2 retries, exponential backoff for 5xx/timeouts).
+    NEVER retries on HTTP 429 (rate limit). what ("quote", "profile") labels the logs.
+
+    Returns (response, None) for a 200 or 304, else (None, error).
     """
     global _api_call_count
-    api_key = os.environ.get("FINNHUB_API_KEY", "").strip()
+    api_key = _api_key()
     if not api_key:
         logger.error("FINNHUB_API_KEY not set")
-        return {"status": "error", "error": "FINNHUB_API_KEY not set"}
+        return None, "FINNHUB_API_KEY not set"
 
-    url = f"{FINNHUB_BASE_URL}{FINNHUB_PROFILE_PATH}"
     params = {"symbol": symbol, "token": api_key}
 
     sem = _get_semaphore()
     async with sem:
-        logger.debug("Acquired semaphore for profile %s (concurrent requests limited to %d)", symbol, DEFAULT_MAX_CONCURRENT)
-        for attempt in range(MAX_RETRIES + 1):
+        for attempt in range(MAX_RETRIES + 1):  # 1 initial + MAX_RETRIES retries
             try:
                 _api_call_count += 1
-                logger.debug("Fetching company profile for %s (attempt %d/%d)", symbol, attempt + 1, MAX_RETRIES + 1)
-                async with httpx.AsyncClient(timeout=DEFAULT_TIMEOUT) as client:
-                    resp = await client.get(url, params=params)
+                if logger.isEnabledFor(logging.DEBUG):
+                    logger.debug("Fetching %s for %s (attempt %d/%d)", what, symbol, attempt + 1, MAX_RETRIES + 1)
+                resp = await _get_client().get(path, params=params, headers=headers)
                 
                 # HTTP 429: Rate limited - NEVER retry
                 if resp.status_code == 429:
-                    logger.warning("HTTP 429 (rate limited) for profile %s - NOT retrying", symbol)
-                    return {"status": "error", "error": "rate_limited"}
+                    logger.warning("HTTP 429 (rate limited) for %s %s - NOT retrying", what, symbol)
+                    return None, "rate_limited"
                 
                 # HTTP 5xx or 408: Retry with exponential backoff
                 if resp.status_code >= 500 or resp.status_code == 408:
                     if attempt < MAX_RETRIES:
                         backoff = 2 ** attempt
-                        logger.warning("HTTP %d for profile %s, retrying in %d seconds (attempt %d/%d)", 
-                                     resp.status_code, symbol, backoff, attempt + 1, MAX_RETRIES + 1)
+                        logger.warning("HTTP %d for %s %s, retrying in %d seconds (attempt %d/%d)", 
+                                     resp.status_code, what, symbol, backoff, attempt + 1, MAX_RETRIES + 1)
                         await asyncio.sleep(backoff)
                         continue
-                    logger.error("HTTP %d for profile %s after %d attempts", resp.status_code, symbol, MAX_RETRIES + 1)
-                    return {"status": "error", "error": f"HTTP {resp.status_code}"}
+                    logger.error("HTTP %d for %s %s after %d attempts", resp.status_code, what, symbol, MAX_RETRIES + 1)
+                    return None, f"HTTP {resp.status_code}"
                 
-                # Other non-200 status codes: Don't retry
-                if resp.status_code != 200:
-                    logger.warning("HTTP %d for profile %s - not retrying", resp.status_code, symbol)
-                    return {"status": "error", "error": f"HTTP {resp.status_code}"}
+                # Other non-200 status codes (304 only answers a conditional request): Don't retry
+                if resp.status_code != 200 and resp.status_code != 304:
+                    logger.warning("HTTP %d for %s %s - not retrying", resp.status_code, what, symbol)
+                    return None, f"HTTP {resp.status_code}"
                 
-                # Parse successful response
-                data = resp.json()
-                if isinstance(data, dict):
-                    # Market cap is in 'marketCapitalization' field (in USD)
-                    market_cap = data.get("marketCapitalization")
-                    if market_cap is not None:
-                        try:
-                            market_cap_float = float(market_cap)
-                            logger.debug("Successfully fetched profile for %s, marketCap=%.2f", symbol, market_cap_float)
-                            return {"marketCap": market_cap_float}
-                        except (ValueError, TypeError):
-                            logger.warning("Invalid marketCap value for %s: %s", symbol, market_cap)
-                            return {"status": "error", "error": "invalid marketCap"}
-                    # Market cap not available - not an error, just missing data
-                    logger.debug("Market cap not available for %s", symbol)
-                    return {"marketCap": None}
-                logger.warning("Invalid response format for profile %s", symbol)
-                return {"status": "error", "error": "invalid response"}
+                return resp, None
                 
             except httpx.TimeoutException:
                 if attempt < MAX_RETRIES:
                     backoff = 2 ** attempt
-                    logger.warning("Timeout for profile %s, retrying in %d seconds (attempt %d/%d)", 
-                                 symbol, backoff, attempt + 1, MAX_RETRIES + 1)
+                    logger.warning("Timeout for %s %s, retrying in %d seconds (attempt %d/%d)", 
+                                 what, symbol, backoff, attempt + 1, MAX_RETRIES + 1)
                     await asyncio.sleep(backoff)
                     continue
-                logger.error("Timeout for profile %s after %d attempts", symbol, MAX_RETRIES + 1)
-                return {"status": "error", "error": "timeout"}
+                logger.error("Timeout for %s %s after %d attempts", what, symbol, MAX_RETRIES + 1)
+                return None, "timeout"
             except Exception as e:
-                logger.exception("Unexpected error fetching profile for %s: %s", symbol, e)
-                return {"status": "error", "error": str(e)}
+                logger.exception("Unexpected error fetching %s for %s: %s", what, symbol, e)
+                # Don't retry on unexpected errors
+                return None, str(e)
     
-    logger.error("Failed to fetch profile for %s after all attempts", symbol)
-    return {"status": "error", "error": "unknown"}
+    logger.error("Failed to fetch %s for %s after all attempts", what, symbol)
+    return None, "unknown"
 
 
-async def fetch_quote(symbol: str) -> dict[str, Any]:
+async def fetch_company_profile(symbol: str) -> dict[str, Any]:
     """
-    Fetch quote from Finnhub with retries (max 2 retries, exponential backoff for 5xx/timeouts).
-    NEVER retries on HTTP 429 (rate limit).
-    
-    Returns dict with close, prevClose, open, high, low, change, pctChange, or error fields.
+    Fetch company profile from Finnhub to get market cap.
+    Returns dict with marketCap (in USD) or error fields.
     """
-    global _api_call_count
-    api_key = os.environ.get("FINNHUB_API_KEY", "").strip()
-    if not api_key:
-        logger.error("FINNHUB_API_KEY not set")
-        return {"status": "error", "error": "FINNHUB_API_KEY not set"}
-
-    url = f"{FINNHUB_BASE_URL}{FINNHUB_QUOTE_PATH}"
-    params = {"symbol": symbol, "token": api_key}
+    resp, error = await _get_with_retries(FINNHUB_PROFILE_PATH, symbol, "profile")
+    if resp is None:
+        return {"status": "error", "error": error}
 
-    sem = _get_semaphore()
-    async with sem:
-        logger.debug("Acquired semaphore for %s (concurrent requests limited to %d)", symbol, DEFAULT_MAX_CONCURRENT)
-        for attempt in range(MAX_RETRIES + 1):  # 1 initial + MAX_RETRIES retries
+    # Parse successful response
+    try:
+        data = resp.json()
+    except ValueError:
+        data = None
+    if isinstance(data, dict):
+        # Market cap is in 'marketCapitalization' field (in USD)
+        market_cap = data.get("marketCapitalization")
+        if market_cap is not None:
             try:
-                _api_call_count += 1
-                logger.debug("Fetching quote for %s (attempt %d/%d)", symbol, attempt + 1, MAX_RETRIES + 1)
-                async with httpx.AsyncClient(timeout=DEFAULT_TIMEOUT) as client:
-                    resp = await client.get(url, params=params)
-                
-                # HTTP 429: Rate limited - NEVER retry
-                if resp.status_code == 429:
-                    logger.warning("HTTP 429 (rate limited) for %s - NOT retrying", symbol)
-                    return {"status": "error", "error": "rate_limited"}
-                
-                # HTTP 5xx or 408: Retry with exponential backoff
-                if resp.status_code >= 500 or resp.status_code == 408:
-                    if attempt < MAX_RETRIES:
-                        backoff = 2 ** attempt
-                        logger.warning("HTTP %d for %s, retrying in %d seconds (attempt %d/%d)", 
-                                     resp.status_code, symbol, backoff, attempt + 1, MAX_RETRIES + 1)
-                        await asyncio.sleep(backoff)
-                        continue
-                    logger.error("HTTP %d for %s after %d attempts", resp.status_code, symbol, MAX_RETRIES + 1)
-                    return {"status": "error", "error": f"HTTP {resp.status_code}"}
-                
-                # Other non-200 status codes: Don't retry
-                if resp.status_code != 200:
-                    logger.warning("HTTP %d for %s - not retrying", resp.status_code, symbol)
-                    return {"status": "error", "error": f"HTTP {resp.status_code}"}
-                
-                # Parse successful response
-                data = resp.json()
-                if isinstance(data, dict) and "c" in data:
-                    logger.debug("Successfully fetched quote for %s", symbol)
-                    return _parse_quote_response(data, symbol)
-                logger.warning("Invalid response format for %s: missing 'c' field", symbol)
-                return {"status": "error", "error": "invalid response"}
-                
-            except httpx.TimeoutException:
-                if attempt < MAX_RETRIES:
-                    backoff = 2 ** attempt
-                    logger.warning("Timeout for %s, retrying in %d seconds (attempt %d/%d)", 
-                                 symbol, backoff, attempt + 1, MAX_RETRIES + 1)
-                    await asyncio.sleep(backoff)
-                    continue
-                logger.error("Timeout for %s after %d attempts", symbol, MAX_RETRIES + 1)
-                return {"status": "error", "error": "timeout"}
-            except Exception as e:
-                logger.exception("Unexpected error fetching quote for %s: %s", symbol, e)
-                # Don't retry on unexpected errors
-                return {"status": "error", "error": str(e)}
+                market_cap_float = float(market_cap)
+                if logger.isEnabledFor(logging.DEBUG):
+                    logger.debug("Successfully fetched profile for %s, marketCap=%.2f", symbol, market_cap_float)
+                return {"marketCap": market_cap_float}
+            except (ValueError, TypeError):
+                logger.warning("Invalid marketCap value for %s: %s", symbol, market_cap)
+                return {"status": "error", "error": "invalid marketCap"}
+        # Market cap not available - not an error, just missing data
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug("Market cap not available for %s", symbol)
+        return {"marketCap": None}
+    logger.warning("Invalid response format for profile %s", symbol)
+    return {"status": "error", "error": "invalid response"}
+
+
+async def fetch_quote(symbol: str, etag: Optional[str] = None) -> QuoteResult:
+    """
+    Fetch quote from Finnhub (retry policy in _get_with_retries).
+    With etag, sends If-None-Match; a 304 comes back as status="not_modified".
     
-    logger.error("Failed to fetch quote for %s after all attempts", symbol)
-    return {"status": "error", "error": "unknown"}
+    Returns a QuoteResult (status="error" with error set on failure).
+    """
+    headers = {"If-None-Match": etag} if etag else None
+    resp, error = await _get_with_retries(FINNHUB_QUOTE_PATH, symbol, "quote", headers)
+    if resp is None:
+        return QuoteResult(status="error", error=error)
+
+    # HTTP 304: cached quote is still current
+    if resp.status_code == 304:
+        return QuoteResult(status="not_modified")
+
+    # Parse successful response
+    try:
+        data = resp.json()
+    except ValueError:
+        data = None
+    if isinstance(data, dict) and "c" in data:
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug("Successfully fetched quote for %s", symbol)
+        if USE_ETAG:
+            new_etag = resp.headers.get("etag")
+            if new_etag:
+                _quote_etags[_quote_key(symbol)] = new_etag
+        return _parse_quote_response(data, symbol)
+    logger.warning("Invalid response format for %s: missing 'c' field", symbol)
+    return QuoteResult(status="error", error="invalid response")
 
 
 async def get_quote(
@@ -219,15 +275,16 @@ async def get_quote(
     *,
     use_cache: bool = True,
     refresh: bool = False,
-) -> tuple[dict[str, Any], str]:
+) -> tuple[QuoteResult, str]:
     """
     Get quote for symbol: check cache first (unless refresh), then rate limit, then fetch.
     
     Flow:
-    1. If use_cache=True and refresh=False: check cache (fresh or stale)
-    2. If cache miss or refresh=True: check rate limiter
-    3. If rate limited: return stale cache if available, else error
-    4. If allowed: acquire semaphore, fetch from API, cache result
+    1. If use_cache=True and refresh=False: return fresh cache hit
+    2. If a fetch for this symbol is already in flight: await that one instead
+    3. Otherwise check rate limiter
+    4. If rate limited: return stale cache if available, else error
+    5. If allowed: acquire semaphore, fetch from API, cache result
     
     Returns (payload, source) where source is:
     - "cache": fresh cached data
@@ -235,54 +292,118 @@ async def get_quote(
     - "finnhub": live API response
     - "error": error occurred and no cache available
     
-    Payload includes close, prevClose, ... or status/error.
+    Payload is a QuoteResult: close, prevClose, ... or status="error" with error.
+    Never raises: unexpected failures come back as an error payload.
+    """
+    return await _get_quote(symbol, use_cache=use_cache, refresh=refresh, pool=None)
+
+
+class _TokenPool:
+    """Tokens granted by one acquire_n, handed out only to fetches that actually run."""
+
+    __slots__ = ("remaining",)
+
+    def __init__(self, granted: int):
+        self.remaining = granted
+
+    def take(self) -> bool:
+        if self.remaining <= 0:
+            return False
+        self.remaining -= 1
+        return True
+
+
+async def _get_quote(
+    symbol: str, *, use_cache: bool, refresh: bool, pool: Optional[_TokenPool]
+) -> tuple[QuoteResult, str]:
+    """
+    get_quote body. pool is None to take a limiter token here, or a batch grant to
+    draw from (see get_quotes / acquire_n).
     """
     cache = get_quote_cache()
-    limiter = get_rate_limiter()
-    key = f"quote:{symbol.upper()}"
-
-    # Step 1: Check cache first (unless refresh is requested)
-    if use_cache and not refresh:
-        cached = cache.get(key)
-        if cached:
-            value, source = cached
-            logger.debug("Quote for %s from %s (cache hit)", symbol, source)
-            return (value, source)
-
-    # Step 2: Cache miss or refresh requested - check rate limiter
-    logger.debug("Cache miss or refresh requested for %s, checking rate limiter", symbol)
-    allowed = await limiter.acquire()
-    
-    if not allowed:
-        # Step 3: Rate limited - prefer stale cache over failing
-        logger.warning("Rate limited for %s, checking for stale cache", symbol)
-        stale = cache.get(key)
-        if stale:
-            value, _ = stale
-            logger.info("Rate limited; serving stale cache for %s", symbol)
-            return (value, "stale_cache")
-        # No cache available at all
-        stats = await limiter.get_stats()
-        logger.error("Rate limited for %s with no cache available. Limiter stats: %s", symbol, stats)
-        return (
-            {"status": "error", "error": "rate_limited", "symbol": symbol},
-            "error",
-        )
+    key = _quote_key(symbol)
 
-    # Step 4: Rate limit allows - fetch from API
-    logger.debug("Rate limit allows, fetching quote for %s from Finnhub", symbol)
-    result = await fetch_quote(symbol)
-    
-    if "status" not in result or result.get("status") != "error":
-        # Success - cache the result
-        cache.set(key, result)
-        logger.info("Quote for %s fetched from finnhub and cached", symbol)
+    async def _fetch() -> tuple[QuoteResult, str]:
+        limiter = get_rate_limiter()
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug("Cache miss or refresh requested for %s, checking rate limiter", symbol)
+        allowed = await limiter.acquire_async() if pool is None else pool.take()
+        
+        if not allowed:
+            # Rate limited - prefer stale cache over failing
+            logger.warning("Rate limited for %s, checking for stale cache", symbol)
+            # get_or_fetch already looked this key up (and counted it); don't count it twice
+            value = cache.peek(key)
+            if value is not None:
+                logger.info("Rate limited; serving stale cache for %s", symbol)
+                return (value, "stale_cache")
+            # No cache available at all
+            stats = limiter.get_stats()
+            logger.error("Rate limited for %s with no cache available. Limiter stats: %s", symbol, stats)
+            return (QuoteResult(status="error", error="rate_limited"), "error")
+
+        # Rate limit allows - fetch from API, revalidating the cached quote if we can
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug("Rate limit allows, fetching quote for %s from Finnhub", symbol)
+        cached = cache.peek(key) if USE_ETAG else None
+        etag = _quote_etags.get(key) if cached is not None else None
+        result = await fetch_quote(symbol, etag=etag)
+        if result.status == "not_modified":
+            result = cached
+
+        if result.status != "error":
+            # Success - cache the result
+            cache.set(key, result)
+            logger.info("Quote for %s fetched from finnhub and cached", symbol)
+            return (result, "finnhub")
+        
+        # API call failed - log and return error
+        logger.warning("Quote fetch failed for %s: %s", symbol, result.error or "unknown error")
         return (result, "finnhub")
-    
-    # API call failed - log and return error
-    error_msg = result.get("error", "unknown error")
-    logger.warning("Quote fetch failed for %s: %s", symbol, error_msg)
-    return (result, "finnhub")
+
+    try:
+        return await cache.get_or_fetch(key, _fetch, use_cache=use_cache and not refresh)
+    except Exception as e:
+        logger.exception("Unexpected error getting quote for %s: %s", symbol, e)
+        return (QuoteResult(status="error", error=str(e)), "error")
+
+
+async def get_quotes(
+    symbols: list[str],
+    *,
+    refresh: bool = False,
+) -> dict[str, tuple[QuoteResult, str]]:
+    """
+    Get quotes for many symbols at once, keyed by symbol (duplicates collapsed).
+    Fresh cache hits are answered inline; only the misses are fetched, concurrently.
+    """
+    cache = get_quote_cache()
+    out: dict[str, tuple[QuoteResult, str]] = {}
+    misses: list[str] = []
+    for symbol in dict.fromkeys(symbols):
+        cached = None if refresh else cache.get(_quote_key(symbol))
+        if cached and cached[1] == "cache":
+            out[symbol] = cached
+        else:
+            misses.append(symbol)
+
+    if misses:
+        # One limiter update for the whole batch. Fetches draw from the grant only when
+        # they actually call Finnhub (not when they join an in-flight fetch); once it is
+        # spent the rest are rate limited and fall back to stale cache / error
+        limiter = get_rate_limiter()
+        pool = _TokenPool(await limiter.acquire_n_async(len(misses)))
+        try:
+            # The partition above already did the cache lookup (and counted it); don't repeat it
+            results = await asyncio.gather(*(
+                _get_quote(s, use_cache=False, refresh=refresh, pool=pool) for s in misses
+            ))
+        finally:
+            # Zero the pool first: a detached fetch task must not draw a returned token
+            unused, pool.remaining = pool.remaining, 0
+            await limiter.release_n_async(unused)
+        out.update(zip(misses, results))
+    return out
 
 
 async def get_company_profile(
@@ -293,6 +414,7 @@ async def get_company_profile(
 ) -> tuple[dict[str, Any], str]:
     """
     Get company profile for symbol: check cache first (unless refresh), then rate limit, then fetch.
+    Concurrent callers for the same symbol share one in-flight fetch (see get_quote).
     
     Returns (payload, source) where source is:
     - "cache": fresh cached data
@@ -301,53 +423,54 @@ async def get_company_profile(
     - "error": error occurred and no cache available
     
     Payload includes marketCap or status/error.
+    Never raises: unexpected failures come back as an error payload.
     """
     cache = get_quote_cache()
-    limiter = get_rate_limiter()
-    key = f"profile:{symbol.upper()}"
-
-    # Step 1: Check cache first (unless refresh is requested)
-    if use_cache and not refresh:
-        cached = cache.get(key)
-        if cached:
-            value, source = cached
-            logger.debug("Profile for %s from %s (cache hit)", symbol, source)
-            return (value, source)
-
-    # Step 2: Cache miss or refresh requested - check rate limiter
-    logger.debug("Cache miss or refresh requested for profile %s, checking rate limiter", symbol)
-    allowed = await limiter.acquire()
-    
-    if not allowed:
-        # Step 3: Rate limited - prefer stale cache over failing
-        logger.warning("Rate limited for profile %s, checking for stale cache", symbol)
-        stale = cache.get(key)
-        if stale:
-            value, _ = stale
-            logger.info("Rate limited; serving stale cache for profile %s", symbol)
-            return (value, "stale_cache")
-        # No cache available at all
-        stats = await limiter.get_stats()
-        logger.error("Rate limited for profile %s with no cache available. Limiter stats: %s", symbol, stats)
-        return (
-            {"status": "error", "error": "rate_limited", "symbol": symbol},
-            "error",
-        )
+    key = _profile_key(symbol)
 
-    # Step 4: Rate limit allows - fetch from API
-    logger.debug("Rate limit allows, fetching profile for %s from Finnhub", symbol)
-    result = await fetch_company_profile(symbol)
-    
-    if "status" not in result or result.get("status") != "error":
-        # Success - cache the result
-        cache.set(key, result)
-        logger.info("Profile for %s fetched from finnhub and cached", symbol)
+    async def _fetch() -> tuple[dict[str, Any], str]:
+        limiter = get_rate_limiter()
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug("Cache miss or refresh requested for profile %s, checking rate limiter", symbol)
+        allowed = await limiter.acquire_async()
+        
+        if not allowed:
+            # Rate limited - prefer stale cache over failing
+            logger.warning("Rate limited for profile %s, checking for stale cache", symbol)
+            # get_or_fetch already looked this key up (and counted it); don't count it twice
+            value = cache.peek(key)
+            if value is not None:
+                logger.info("Rate limited; serving stale cache for profile %s", symbol)
+                return (value, "stale_cache")
+            # No cache available at all
+            stats = limiter.get_stats()
+            logger.error("Rate limited for profile %s with no cache available. Limiter stats: %s", symbol, stats)
+            return (
+                {"status": "error", "error": "rate_limited", "symbol": symbol},
+                "error",
+            )
+
+        # Rate limit allows - fetch from API
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug("Rate limit allows, fetching profile for %s from Finnhub", symbol)
+        result = await fetch_company_profile(symbol)
+        
+        if "status" not in result or result.get("status") != "error":
+            # Success - cache the result
+            cache.set(key, result, ttl_seconds=PROFILE_TTL)
+            logger.info("Profile for %s fetched from finnhub and cached", symbol)
+            return (result, "finnhub")
+        
+        # API call failed - log and return error
+        error_msg = result.get("error", "unknown error")
+        logger.warning("Profile fetch failed for %s: %s", symbol, error_msg)
         return (result, "finnhub")
-    
-    # API call failed - log and return error
-    error_msg = result.get("error", "unknown error")
-    logger.warning("Profile fetch failed for %s: %s", symbol, error_msg)
-    return (result, "finnhub")
+
+    try:
+        return await cache.get_or_fetch(key, _fetch, use_cache=use_cache and not refresh)
+    except Exception as e:
+        logger.exception("Unexpected error getting profile for %s: %s", symbol, e)
+        return ({"status": "error", "error": str(e), "symbol": symbol}, "error")
 
 
 def get_api_call_count() -> int:
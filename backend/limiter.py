@@ -1,70 +1,424 @@
-"""Token bucket rate limiter for outbound Finnhub API calls."""
+"""Token bucket rate limiter and admission gate for outbound Finnhub API calls."""
 
 import asyncio
 import logging
 import os
 import time
-from typing import Optional
+from typing import Final, Optional, Union
+
+try:
+    import redis
+    import redis.asyncio
+except ImportError:  # optional: only needed when REDIS_URL is set
+    redis = None
 
 logger = logging.getLogger(__name__)
 
 DEFAULT_MAX_CALLS_PER_MIN = int(os.environ.get("FINNHUB_MAX_CALLS_PER_MIN", "50"))
+# Log the first denial and then one in every 256, so a burst doesn't flood the logs
+_DENIAL_LOG_EVERY = 256
+_NS_PER_MINUTE = 60_000_000_000
+# Share one bucket across uvicorn workers through Redis (optional; needs the redis package)
+REDIS_URL = os.environ.get("REDIS_URL", "").strip()
+_REDIS_KEY = "finnhub:ratelimit"
+_REDIS_TIMEOUT_SECONDS = 0.1
+# After a Redis error, skip it (use the in-process bucket) for this long before re-probing
+_REDIS_RETRY_NS = 5 * 1_000_000_000
+# get_stats reuses the credit from the last script reply if it is at most this old
+_REDIS_STATS_MAX_AGE_NS = 5 * 1_000_000_000
+_NS_PER_MS = 1_000_000
+_MS_PER_MINUTE = 60_000
 
 
 class TokenBucketLimiter:
-    """Async token bucket: refill tokens at a fixed rate, consume one per call."""
+    """
+    Token bucket: refill tokens at a fixed rate, consume one per call.
+    "Zero-time" form: the only state is the monotonic_ns instant at which the bucket
+    would have been empty, so refill-and-take is one integer update. There is no lock:
+    the update has no await in it, so on a single event loop no other coroutine can
+    interleave. Only call it from the loop thread; threadpool callers would need one.
+    """
+
+    __slots__ = (
+        "_max",
+        "_ns_per_token",
+        "_burst_ns",
+        "_rate_per_sec",
+        "_zero_time_ns",
+        "_total_acquired",
+        "_total_denied",
+    )
 
     def __init__(self, max_calls_per_minute: Optional[int] = None):
         self._max = max_calls_per_minute if max_calls_per_minute is not None else DEFAULT_MAX_CALLS_PER_MIN
-        self._tokens = float(self._max)
-        self._last_refill = time.monotonic()
-        self._lock = asyncio.Lock()
+        # Time credit one token costs; with max <= 0 no credit ever reaches it
+        self._ns_per_token = _NS_PER_MINUTE // self._max if self._max > 0 else _NS_PER_MINUTE + 1
+        self._burst_ns = _NS_PER_MINUTE  # a full bucket is one minute of credit
+        self._rate_per_sec = self._max / 60.0
+        self._zero_time_ns = time.monotonic_ns() - self._burst_ns
         self._total_acquired = 0
         self._total_denied = 0
         logger.info("TokenBucketLimiter initialized: max=%d calls/min", self._max)
 
-    def _refill(self) -> None:
-        now = time.monotonic()
-        elapsed_minutes = (now - self._last_refill) / 60.0
-        self._tokens = min(
-            self._max,
-            self._tokens + elapsed_minutes * self._max,
-        )
-        self._last_refill = now
+    def _credit_ns(self, now: int) -> int:
+        return min(now - self._zero_time_ns, self._burst_ns)
 
-    async def acquire(self) -> bool:
+    def acquire(self) -> bool:
         """
         Consume one token if available. Returns True if allowed, False if rate limited.
         """
-        async with self._lock:
-            self._refill()
-            if self._tokens >= 1:
-                self._tokens -= 1
-                self._total_acquired += 1
-                logger.debug("Token acquired: remaining=%.2f/%d", self._tokens, self._max)
-                return True
-            self._total_denied += 1
-            logger.warning("Rate limit: tokens=%.2f/%d, denied=%d", self._tokens, self._max, self._total_denied)
-            return False
-
-    async def get_stats(self) -> dict:
-        """Return current limiter statistics for logging/debugging."""
-        async with self._lock:
-            self._refill()
-            return {
-                "tokens_remaining": round(self._tokens, 2),
-                "max_tokens": self._max,
-                "total_acquired": self._total_acquired,
-                "total_denied": self._total_denied,
-            }
-
-
-# Singleton
-_limiter: Optional[TokenBucketLimiter] = None
-
-
-def get_rate_limiter() -> TokenBucketLimiter:
-    global _limiter
-    if _limiter is None:
-        _limiter = TokenBucketLimiter()
+        now = time.monotonic_ns()
+        credit = min(now - self._zero_time_ns, self._burst_ns)
+        cost = self._ns_per_token
+        if credit >= cost:
+            self._zero_time_ns = now - credit + cost
+            self._total_acquired += 1
+            if logger.isEnabledFor(logging.DEBUG):
+                logger.debug("Token acquired: remaining=%.2f/%d", (credit - cost) / cost, self._max)
+            return True
+        self._total_denied += 1
+        denied = self._total_denied
+        if (denied - 1) % _DENIAL_LOG_EVERY == 0:
+            logger.warning("Rate limit: tokens=%.2f/%d, denied=%d", credit / cost, self._max, denied)
+        return False
+
+    def acquire_n(self, k: int) -> int:
+        """
+        Consume up to k tokens in one update (for batch fetches).
+        Returns how many were granted; the caller treats the rest as rate limited.
+        """
+        if k <= 0:
+            return 0
+        now = time.monotonic_ns()
+        credit = min(now - self._zero_time_ns, self._burst_ns)
+        cost = self._ns_per_token
+        granted = min(k, credit // cost)
+        self._zero_time_ns = now - credit + granted * cost
+        self._total_acquired += granted
+        before = self._total_denied
+        self._total_denied += k - granted
+        denied = self._total_denied
+        # Same sampling as acquire(): log if this batch crossed a logging mark
+        if granted < k and (denied - 1) // _DENIAL_LOG_EVERY != (before - 1) // _DENIAL_LOG_EVERY:
+            logger.warning("Rate limit: granted %d/%d tokens, denied=%d", granted, k, denied)
+        return granted
+
+    def release_n(self, k: int) -> None:
+        """Give back k tokens from an acquire_n grant that went unused (no call was made)."""
+        if k <= 0:
+            return
+        # Earlier zero time = more credit; _credit_ns still caps it at a full bucket
+        self._zero_time_ns -= k * self._ns_per_token
+        self._total_acquired -= k
+
+    # Awaitable forms, the interface finnhub_client uses so RedisTokenBucket can stand
+    # in; the in-process update never waits, so these just run it
+    async def acquire_async(self) -> bool:
+        return self.acquire()
+
+    async def acquire_n_async(self, k: int) -> int:
+        return self.acquire_n(k)
+
+    async def release_n_async(self, k: int) -> None:
+        self.release_n(k)
+
+    def reset(self) -> None:
+        """Refill the bucket and zero the counters (for tests and manual scripts)."""
+        self._zero_time_ns = time.monotonic_ns() - self._burst_ns
+        self._total_acquired = 0
+        self._total_denied = 0
+
+    def get_stats(self) -> dict:
+        """Return a snapshot of limiter statistics for logging/debugging (read-only)."""
+        credit = self._credit_ns(time.monotonic_ns())
+        return {
+            "tokens_remaining": round(credit / self._ns_per_token, 2) if self._max > 0 else 0.0,
+            "refill_per_sec": round(self.refill_rate, 4),
+            "max_tokens": self._max,
+            "total_acquired": self._total_acquired,
+            "total_denied": self._total_denied,
+        }
+
+    @property
+    def refill_rate(self) -> float:
+        """Tokens added back per second."""
+        return self._rate_per_sec
+
+
+# Zero-time bucket in Redis: the key holds the epoch-ms instant the shared bucket was
+# empty; Redis TIME is the one clock all workers agree on. Computes the credit and
+# takes up to k tokens atomically, writing only when something was granted (a
+# missing key means a full bucket). A negative k gives -k tokens back; reads cap the
+# credit at a full bucket. Returns {granted, ms of credit left}.
+_REDIS_ACQUIRE_LUA = """
+local t = redis.call('TIME')
+local now = tonumber(t[1]) * 1000 + math.floor(tonumber(t[2]) / 1000)
+local cost = tonumber(ARGV[1])
+local burst = tonumber(ARGV[2])
+local k = tonumber(ARGV[3])
+local zero = tonumber(redis.call('GET', KEYS[1])) or (now - burst)
+local credit = math.min(now - zero, burst)
+local granted = math.min(k, math.floor(credit / cost))
+if granted ~= 0 then
+  redis.call('SET', KEYS[1], now - credit + granted * cost, 'PX', 2 * burst)
+end
+return {granted, credit - granted * cost}
+"""
+
+
+class RedisTokenBucket:
+    """
+    TokenBucketLimiter with its state in Redis, so N uvicorn workers share one
+    Finnhub quota instead of each granting the full rate.
+    The acquire path is async only (acquire_async / acquire_n_async / release_n_async,
+    on redis.asyncio), so a round trip never blocks the event loop. A Redis error opens
+    a circuit breaker: for the next few seconds calls go straight to an in-process
+    bucket without touching Redis. get_stats answers from the last script reply and
+    refreshes it in the background when stale. Counters in get_stats are per worker.
+    """
+
+    __slots__ = (
+        "_max",
+        "_cost_ms",
+        "_client",
+        "_script",
+        "_sync_client",
+        "_fallback",
+        "_degraded",
+        "_retry_at_ns",
+        "_left_ms",
+        "_left_at_ns",
+        "_refresh_task",
+        "_total_acquired",
+        "_total_denied",
+    )
+
+    def __init__(
+        self,
+        client: "redis.asyncio.Redis",
+        sync_client: "redis.Redis",
+        max_calls_per_minute: Optional[int] = None,
+    ):
+        self._max = max_calls_per_minute if max_calls_per_minute is not None else DEFAULT_MAX_CALLS_PER_MIN
+        self._cost_ms = _MS_PER_MINUTE // self._max if self._max > 0 else _MS_PER_MINUTE + 1
+        self._client = client
+        self._script = client.register_script(_REDIS_ACQUIRE_LUA)
+        self._sync_client = sync_client  # startup probe and reset() only, never the hot path
+        self._fallback = TokenBucketLimiter(self._max)
+        self._degraded = False
+        self._retry_at_ns = 0
+        self._left_ms = _MS_PER_MINUTE  # credit at the last reply; stale until the first one
+        self._left_at_ns = 0
+        self._refresh_task: Optional[asyncio.Task] = None
+        self._total_acquired = 0
+        self._total_denied = 0
+        logger.info("RedisTokenBucket initialized: max=%d calls/min, key=%s", self._max, _REDIS_KEY)
+
+    async def _take(self, k: int) -> Optional[tuple[int, int]]:
+        """Run the script; None if Redis is unavailable or the breaker is open (warns once per outage)."""
+        now = time.monotonic_ns()
+        if now < self._retry_at_ns:
+            return None
+        try:
+            granted, left_ms = await self._script(keys=[_REDIS_KEY], args=[self._cost_ms, _MS_PER_MINUTE, k])
+        except redis.RedisError as e:
+            self._retry_at_ns = time.monotonic_ns() + _REDIS_RETRY_NS
+            if not self._degraded:
+                self._degraded = True
+                logger.warning("Redis limiter unavailable (%s); using in-process bucket", e)
+            return None
+        if self._degraded:
+            self._degraded = False
+            logger.info("Redis limiter reachable again")
+        self._left_ms, self._left_at_ns = int(left_ms), time.monotonic_ns()
+        return int(granted), self._left_ms
+
+    async def acquire_async(self) -> bool:
+        """Consume one shared token. Returns True if allowed, False if rate limited."""
+        return await self.acquire_n_async(1) == 1
+
+    async def acquire_n_async(self, k: int) -> int:
+        """Consume up to k shared tokens in one round trip; returns how many were granted."""
+        if k <= 0:
+            return 0
+        taken = await self._take(k)
+        # The fallback bucket logs its own denials
+        granted = self._fallback.acquire_n(k) if taken is None else taken[0]
+        self._total_acquired += granted
+        before = self._total_denied
+        self._total_denied += k - granted
+        denied = self._total_denied
+        crossed = (denied - 1) // _DENIAL_LOG_EVERY != (before - 1) // _DENIAL_LOG_EVERY
+        if taken is not None and granted < k and crossed:
+            logger.warning("Rate limit (shared): granted %d/%d tokens, denied=%d", granted, k, denied)
+        return granted
+
+    async def release_n_async(self, k: int) -> None:
+        """Give back k unused tokens from an acquire_n_async grant to the shared bucket."""
+        if k <= 0:
+            return
+        if await self._take(-k) is None:
+            self._fallback.release_n(k)
+        self._total_acquired -= k
+
+    def reset(self) -> None:
+        """Refill the shared bucket and zero this worker's counters (for tests and manual scripts)."""
+        try:
+            self._sync_client.delete(_REDIS_KEY)
+        except redis.RedisError as e:
+            logger.warning("Redis limiter reset failed: %s", e)
+        else:
+            self._left_ms, self._left_at_ns = _MS_PER_MINUTE, time.monotonic_ns()
+        self._fallback.reset()
+        self._retry_at_ns = 0
+        self._total_acquired = 0
+        self._total_denied = 0
+
+    async def _refresh(self) -> None:
+        await self._take(0)
+
+    def get_stats(self) -> dict:
+        """
+        Return a snapshot of limiter statistics. tokens_remaining is the shared bucket's
+        as of the last script reply plus refill since; other workers' use shows up
+        at the next refresh.
+        """
+        now = time.monotonic_ns()
+        stale = now - self._left_at_ns > _REDIS_STATS_MAX_AGE_NS
+        if stale and (self._refresh_task is None or self._refresh_task.done()):
+            try:
+                self._refresh_task = asyncio.get_running_loop().create_task(self._refresh())
+            except RuntimeError:
+                pass  # no running loop: report the last known value
+        if self._degraded:
+            tokens = self._fallback.get_stats()["tokens_remaining"]
+        elif self._max > 0:
+            left_ms = min(self._left_ms + (now - self._left_at_ns) // _NS_PER_MS, _MS_PER_MINUTE)
+            tokens = round(left_ms / self._cost_ms, 2)
+        else:
+            tokens = 0.0
+        return {
+            "tokens_remaining": tokens,
+            "refill_per_sec": round(self.refill_rate, 4),
+            "max_tokens": self._max,
+            "total_acquired": self._total_acquired,
+            "total_denied": self._total_denied,
+        }
+
+    @property
+    def refill_rate(self) -> float:
+        """Tokens added back per second."""
+        return self._max / 60.0
+
+
+RateLimiter = Union[TokenBucketLimiter, RedisTokenBucket]
+
+
+class AdmissionGate:
+    """
+    Async admission gate capping how many tasks run at once.
+    Works like asyncio.Semaphore, but is a Condition over a counter so the cap
+    can be resized at runtime (set_cmax) without losing waiters.
+    """
+
+    def __init__(self, max_in_flight: int):
+        self._active = 0
+        self._cmax = max(1, max_in_flight)
+        self._cond = asyncio.Condition()
+        logger.info("AdmissionGate initialized: max_in_flight=%d", self._cmax)
+
+    async def acquire(self) -> None:
+        """Wait until fewer than cmax tasks are admitted, then admit this one."""
+        async with self._cond:
+            try:
+                await self._cond.wait_for(lambda: self._active < self._cmax)
+            except asyncio.CancelledError:
+                # A notify aimed at this waiter would be lost with it; pass it on
+                self._cond.notify(1)
+                raise
+            self._active += 1
+
+    async def release(self) -> None:
+        async with self._cond:
+            self._active -= 1
+            self._cond.notify(1)
+
+    async def set_cmax(self, cmax: int) -> None:
+        """Resize the cap. Raising it wakes waiters; lowering it drains naturally."""
+        cmax = max(1, cmax)
+        async with self._cond:
+            grew = cmax > self._cmax
+            self._cmax = cmax
+            if grew:
+                self._cond.notify_all()
+
+    @property
+    def cmax(self) -> int:
+        return self._cmax
+
+    @property
+    def active(self) -> int:
+        return self._active
+
+    async def __aenter__(self) -> "AdmissionGate":
+        await self.acquire()
+        return self
+
+    async def __aexit__(self, *exc) -> None:
+        await self.release()
+
+
+async def size_gate_to_limiter(
+    gate: AdmissionGate,
+    limiter: RateLimiter,
+    max_in_flight: int,
+    interval_seconds: float = 1.0,
+    min_in_flight: int = 2,
+    tokens_per_slot: int = 1,
+) -> None:
+    """
+    Keep gate's cap at what the token bucket can absorb over the next interval.
+    Admitting more tasks than there are tokens only holds sockets for calls that
+    will be denied. tokens_per_slot is how many tokens one admitted task can spend
+    (e.g. 2 for a quote + profile fetch). Runs until cancelled.
+    """
+    while True:
+        stats = limiter.get_stats()
+        tokens = stats["tokens_remaining"] + limiter.refill_rate * interval_seconds
+        budget = tokens / max(1, tokens_per_slot)
+        target = max(min_in_flight, min(max_in_flight, int(budget)))
+        if target != gate.cmax:
+            logger.debug("AdmissionGate resized: %d -> %d (tokens=%.2f)",
+                         gate.cmax, target, stats["tokens_remaining"])
+            await gate.set_cmax(target)
+        await asyncio.sleep(interval_seconds)
+
+
+def _make_limiter() -> RateLimiter:
+    """Redis-backed bucket when REDIS_URL is set and reachable, else in-process."""
+    if not REDIS_URL:
+        return TokenBucketLimiter()
+    if redis is None:
+        logger.warning("REDIS_URL is set but the redis package is not installed; using in-process limiter")
+        return TokenBucketLimiter()
+    timeouts = {"socket_timeout": _REDIS_TIMEOUT_SECONDS, "socket_connect_timeout": _REDIS_TIMEOUT_SECONDS}
+    sync_client = redis.Redis.from_url(REDIS_URL, **timeouts)
+    try:
+        sync_client.ping()  # no event loop yet at import, so probe with the sync client
+    except redis.RedisError as e:
+        logger.warning("Redis at REDIS_URL unreachable (%s); using in-process limiter", e)
+        return TokenBucketLimiter()
+    return RedisTokenBucket(redis.asyncio.Redis.from_url(REDIS_URL, **timeouts), sync_client)
+
+
+# Singleton, created at import (see cache.quote_cache)
+_limiter: Final[RateLimiter] = _make_limiter()
+
+
+def get_rate_limiter() -> RateLimiter:
     return _limiter
+
+
+def reset_rate_limiter() -> None:
+    """Reset the shared limiter in place, so references already handed out stay valid."""
+    _limiter.reset()
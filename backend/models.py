@@ -1,17 +1,14 @@
 """Pydantic models for the financial dashboard API."""
 
+from dataclasses import dataclass
 from datetime import datetime
-from typing import Optional
+from typing import Literal, Optional
 
 from pydantic import BaseModel
 
-
-# --- Constituent (from local JSON) ---
-class Constituent(BaseModel):
-    symbol: str
-    name: str
-    sector: str
-    subIndustry: str
+# Closed value sets for quote fields ("error" source: failed with no cache to fall back on)
+QuoteStatus = Literal["ok", "error"]
+QuoteSource = Literal["finnhub", "cache", "stale_cache", "error"]
 
 
 # --- Index (S&P 500 proxy) ---
@@ -23,7 +20,7 @@ class IndexResponse(BaseModel):
     change: float
     pctChange: float
     ts: datetime
-    source: str  # "finnhub" | "cache" | "stale_cache"
+    source: QuoteSource
 
 
 # --- Sector list ---
@@ -40,7 +37,11 @@ class SubIndustrySummary(BaseModel):
 
 
 # --- Company quote (for sector/subsector responses) ---
-class CompanyQuote(BaseModel):
+# One per company per sector request, built from trusted client payloads: a slotted
+# dataclass instead of a BaseModel. orjson encodes it natively; Pydantic still uses
+# it for the SectorResponse schema.
+@dataclass(slots=True, frozen=True)
+class CompanyQuote:
     symbol: str
     name: str
     subIndustry: str
@@ -52,9 +53,9 @@ class CompanyQuote(BaseModel):
     change: float = 0.0
     pctChange: float = 0.0
     marketCap: Optional[float] = None  # Market cap in USD
-    status: str = "ok"  # "ok" | "error"
+    status: QuoteStatus = "ok"
     error: Optional[str] = None
-    source: str = "finnhub"  # "finnhub" | "cache" | "stale_cache"
+    source: QuoteSource = "finnhub"
 
 
 # --- Sector/Subsector response meta ---
@@ -74,6 +75,33 @@ class SectorResponse(BaseModel):
     meta: SectorMeta
 
 
+# --- Sector/Subsector response, column layout (?format=compact) ---
+class CompanyQuoteColumns(BaseModel):
+    """CompanyQuote fields as parallel lists: companies[i] is each list's i-th item."""
+
+    symbol: list[str]
+    name: list[str]
+    subIndustry: list[str]
+    close: list[float]
+    prevClose: list[float]
+    open: list[float]
+    high: list[float]
+    low: list[float]
+    change: list[float]
+    pctChange: list[float]
+    marketCap: list[Optional[float]]
+    status: list[QuoteStatus]
+    error: list[Optional[str]]
+    source: list[QuoteSource]
+
+
+class SectorResponseCompact(BaseModel):
+    sector: str
+    updated_at: datetime
+    companies: CompanyQuoteColumns
+    meta: SectorMeta
+
+
 # --- Health ---
 class HealthResponse(BaseModel):
     ok: bool
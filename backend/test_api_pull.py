@@ -9,6 +9,7 @@ Requires FINNHUB_API_KEY in the environment (e.g. .env or export).
 
 import asyncio
 import os
+import re
 import sys
 
 # Ensure backend is on path when run from project root
@@ -16,24 +17,20 @@ sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
 
 from pathlib import Path
 
+# KEY=value lines (comments and blank lines never match)
+_ENV_LINE = re.compile(r"^[ \t]*([A-Za-z_][A-Za-z0-9_]*)[ \t]*=[ \t]*(.*?)[ \t\r]*$", re.M)
+
 
 def load_env_file(env_path: str = ".env") -> None:
     """Load environment variables from .env file."""
     env_file = Path(env_path)
     if not env_file.exists():
         return
-    
-    with open(env_file, "r") as f:
-        for line in f:
-            line = line.strip()
-            if not line or line.startswith("#"):
-                continue
-            if "=" in line:
-                key, value = line.split("=", 1)
-                key = key.strip()
-                value = value.strip().strip('"').strip("'")
-                if key and value:
-                    os.environ.setdefault(key, value)
+
+    for key, value in _ENV_LINE.findall(env_file.read_text()):
+        value = value.strip('"').strip("'")
+        if value:
+            os.environ.setdefault(key, value)
 
 
 # Load .env file if it exists
@@ -42,11 +39,11 @@ load_env_file()
 import finnhub_client
 
 # S&P 500: Finnhub uses ^GSPC; fallback to SPY if needed
-SP500_SYMBOL = "^GSPC"
+SP500_SYMBOL = sys.intern("^GSPC")
 SP500_NAME = "S&P 500"
 
-# 11 GICS sector ETFs (SPDR Select Sector)
-SECTOR_ETFS = [
+# 11 GICS sector ETFs (SPDR Select Sector); symbols interned like the cache keys
+SECTOR_ETFS: tuple[tuple[str, str], ...] = tuple((sys.intern(sym), name) for sym, name in (
     ("XLK", "Technology"),
     ("XLF", "Financials"),
     ("XLV", "Health Care"),
@@ -58,7 +55,7 @@ SECTOR_ETFS = [
     ("XLU", "Utilities"),
     ("XLRE", "Real Estate"),
     ("XLC", "Communication Services"),
-]
+))
 
 
 async def fetch_all():
@@ -67,43 +64,44 @@ async def fetch_all():
         print("ERROR: FINNHUB_API_KEY is not set. Set it in .env or export it.")
         return
 
-    print("Testing Finnhub API pull: S&P 500 + 11 sector ETFs")
-    print("=" * 60)
+    # Collect the report and write it once at the end
+    lines = ["Testing Finnhub API pull: S&P 500 + 11 sector ETFs", "=" * 60]
 
     # 1) S&P 500
     symbol = SP500_SYMBOL
     payload, source = await finnhub_client.get_quote(symbol, use_cache=True, refresh=True)
-    if payload.get("status") == "error":
-        print(f"  {SP500_NAME} ({symbol}): FAILED - {payload.get('error', 'unknown')}")
+    if payload.status == "error":
+        lines.append(f"  {SP500_NAME} ({symbol}): FAILED - {payload.error or 'unknown'}")
         symbol = "SPY"
         payload, source = await finnhub_client.get_quote("SPY", use_cache=True, refresh=True)
-        if payload.get("status") == "error":
-            print(f"  S&P 500 fallback (SPY): FAILED - {payload.get('error', 'unknown')}")
+        if payload.status == "error":
+            lines.append(f"  S&P 500 fallback (SPY): FAILED - {payload.error or 'unknown'}")
         else:
-            _print_quote("S&P 500 (SPY proxy)", payload, source)
+            lines.append(_format_quote("S&P 500 (SPY proxy)", payload, source))
     else:
-        _print_quote(SP500_NAME, payload, source)
+        lines.append(_format_quote(SP500_NAME, payload, source))
 
-    print()
+    lines.append("")
 
-    # 2) 11 sector ETFs
+    # 2) 11 sector ETFs, fetched concurrently (one limiter update for the batch)
+    quotes = await finnhub_client.get_quotes([sym for sym, _ in SECTOR_ETFS], refresh=True)
     for sym, name in SECTOR_ETFS:
-        payload, source = await finnhub_client.get_quote(sym, use_cache=True, refresh=True)
-        if payload.get("status") == "error":
-            print(f"  {name} ({sym}): FAILED - {payload.get('error', 'unknown')}")
+        payload, source = quotes[sym]
+        if payload.status == "error":
+            lines.append(f"  {name} ({sym}): FAILED - {payload.error or 'unknown'}")
         else:
-            _print_quote(f"{name} ({sym})", payload, source)
+            lines.append(_format_quote(f"{name} ({sym})", payload, source))
 
-    print("=" * 60)
-    print("Done.")
+    lines.append("=" * 60)
+    lines.append("Done.")
+    sys.stdout.write("\n".join(lines) + "\n")
 
 
-def _print_quote(label: str, payload: dict, source: str):
-    close = payload.get("close", 0)
-    prev = payload.get("prevClose", 0)
-    chg = payload.get("change", 0)
-    pct = payload.get("pctChange", 0)
-    print(f"  {label}: close={close:.2f}  prevClose={prev:.2f}  change={chg:+.2f}  pctChange={pct:+.2f}%  [source={source}]")
+def _format_quote(label: str, payload: finnhub_client.QuoteResult, source: str) -> str:
+    return (
+        f"  {label}: close={payload.close:.2f}  prevClose={payload.prevClose:.2f}  "
+        f"change={payload.change:+.2f}  pctChange={payload.pctChange:+.2f}%  [source={source}]"
+    )
 
 
 if __name__ == "__main__":
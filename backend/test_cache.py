@@ -0,0 +1,62 @@
+"""
+Unit tests for cache.py (no network, no Finnhub key needed).
+
+Run from the backend directory:
+    python -m unittest test_cache
+"""
+
+import asyncio
+import os
+import sys
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from cache import QuoteCache
+
+
+class GetOrFetchTest(unittest.IsolatedAsyncioTestCase):
+    def setUp(self):
+        self.cache = QuoteCache(ttl_seconds=60)
+        self.calls = 0
+
+    def _fetcher(self, value, source="finnhub"):
+        async def fetch():
+            self.calls += 1
+            await asyncio.sleep(0.01)
+            return (value, source)
+
+        return fetch
+
+    async def test_follower_survives_leader_cancellation(self):
+        fetch = self._fetcher({"marketCap": 1.0})
+        leader = asyncio.create_task(self.cache.get_or_fetch("profile:X", fetch))
+        follower = asyncio.create_task(self.cache.get_or_fetch("profile:X", fetch))
+        await asyncio.sleep(0)
+        leader.cancel()
+
+        self.assertEqual(await follower, ({"marketCap": 1.0}, "cache"))
+        self.assertEqual(self.calls, 1)
+
+    async def test_follower_keeps_source_of_error_payload(self):
+        error = {"status": "error", "error": "HTTP 500"}
+        fetch = self._fetcher(error)
+        results = await asyncio.gather(
+            self.cache.get_or_fetch("profile:X", fetch),
+            self.cache.get_or_fetch("profile:X", fetch),
+        )
+        self.assertEqual(results, [(error, "finnhub"), (error, "finnhub")])
+        self.assertEqual(self.calls, 1)
+
+
+class PeekTest(unittest.TestCase):
+    def test_peek_is_stats_free_and_drop_aware(self):
+        cache = QuoteCache(ttl_seconds=60)
+        cache.set("quote:A", 1.0)
+        value, _, drop_at = cache._store["quote:A"]
+        cache._store["quote:A"] = (value, 0, drop_at)  # expired but still servable
+        self.assertEqual(cache.peek("quote:A"), 1.0)
+
+        cache._store["quote:A"] = (value, 0, 0)  # older than 2x TTL
+        self.assertIsNone(cache.peek("quote:A"))
+        self.assertEqual(cache.get_stats()["by_prefix"], {})
@@ -0,0 +1,123 @@
+"""
+Unit tests for limiter.py (no network, no Finnhub key needed).
+
+Run from the backend directory:
+    python -m unittest test_limiter
+"""
+
+import asyncio
+import os
+import sys
+import time
+import types
+import unittest
+from unittest import mock
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import limiter
+from limiter import AdmissionGate, RedisTokenBucket, TokenBucketLimiter, size_gate_to_limiter
+
+
+class AdmissionGateTest(unittest.IsolatedAsyncioTestCase):
+    async def test_cancelled_waiter_passes_wakeup_on(self):
+        gate = AdmissionGate(1)
+        await gate.acquire()  # holder A
+        waiter_b = asyncio.create_task(gate.acquire())
+        waiter_c = asyncio.create_task(gate.acquire())
+        await asyncio.sleep(0)  # both now waiting
+
+        await gate.release()  # notifies B...
+        waiter_b.cancel()  # ...which is cancelled before it runs
+        with self.assertRaises(asyncio.CancelledError):
+            await waiter_b
+
+        await asyncio.wait_for(waiter_c, timeout=1)
+        self.assertEqual(gate.active, 1)
+
+
+class SizeGateToLimiterTest(unittest.IsolatedAsyncioTestCase):
+    async def test_budget_is_divided_by_tokens_per_slot(self):
+        gate = AdmissionGate(10)
+        limiter = TokenBucketLimiter(60)  # full bucket: 60 tokens, 1 token/s refill
+        limiter.acquire_n(48)  # ~12 tokens + 1 refill per interval left
+        sizer = asyncio.create_task(
+            size_gate_to_limiter(gate, limiter, 10, interval_seconds=1.0, tokens_per_slot=2)
+        )
+        await asyncio.sleep(0)
+        sizer.cancel()
+        self.assertEqual(gate.cmax, 6)
+
+
+class _FakeRedisError(Exception):
+    pass
+
+
+class _FakeRedis:
+    """
+    In-memory stand-in for the redis clients. The script mirrors _REDIS_ACQUIRE_LUA
+    (epoch-ms zero time, capped credit, negative k gives tokens back).
+    """
+
+    def __init__(self):
+        self.store: dict[str, int] = {}
+        self.down = False
+        self.calls = 0
+
+    def register_script(self, lua: str):
+        async def script(keys, args):
+            self.calls += 1
+            if self.down:
+                raise _FakeRedisError("connection refused")
+            now = int(time.time() * 1000)
+            cost, burst, k = args
+            zero = self.store.get(keys[0], now - burst)
+            credit = min(now - zero, burst)
+            granted = min(k, credit // cost)
+            if granted != 0:
+                self.store[keys[0]] = now - credit + granted * cost
+            return [granted, credit - granted * cost]
+
+        return script
+
+    def delete(self, key: str) -> None:
+        self.store.pop(key, None)
+
+
+class RedisTokenBucketTest(unittest.IsolatedAsyncioTestCase):
+    def setUp(self):
+        patcher = mock.patch.object(limiter, "redis", types.SimpleNamespace(RedisError=_FakeRedisError))
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.fake = _FakeRedis()
+        self.bucket = RedisTokenBucket(self.fake, self.fake, max_calls_per_minute=5)
+
+    async def test_release_gives_tokens_back_to_shared_bucket(self):
+        self.assertEqual(await self.bucket.acquire_n_async(3), 3)
+        await self.bucket.release_n_async(2)
+        self.assertEqual(await self.bucket.acquire_n_async(5), 4)
+        stats = self.bucket.get_stats()
+        self.assertEqual((stats["total_acquired"], stats["total_denied"]), (5, 1))
+
+    async def test_breaker_skips_redis_while_open(self):
+        self.fake.down = True
+        granted = [await self.bucket.acquire_async() for _ in range(8)]
+        self.assertEqual(self.fake.calls, 1)  # only the call that opened the breaker
+        self.assertEqual(granted.count(True), 5)  # fallback bucket: 5 calls/min
+        stats = self.bucket.get_stats()
+        self.assertEqual((stats["total_acquired"], stats["total_denied"]), (5, 3))
+
+        self.fake.down = False
+        self.bucket._retry_at_ns = 0  # backoff elapsed
+        self.assertTrue(await self.bucket.acquire_async())
+        self.assertEqual(self.fake.calls, 2)
+
+    async def test_get_stats_answers_from_last_reply(self):
+        await self.bucket.acquire_n_async(2)
+        self.assertEqual(self.bucket.get_stats()["tokens_remaining"], 3.0)
+        self.assertEqual(self.fake.calls, 1)
+
+        self.bucket._left_at_ns = 0  # last reply too old: refresh in the background
+        self.bucket.get_stats()
+        await asyncio.sleep(0)
+        self.assertEqual(self.fake.calls, 2)